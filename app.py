@@ -1,21 +1,43 @@
 import streamlit as st
-import requests
-import pickle
 import pandas as pd
 import random
-import uuid
 import logging
+import os
+import time
+
+from recommender import tmdb
+from recommender.cache import DiskCache
+from recommender.engine import DEFAULT_ARTIFACT_DIR as ARTIFACT_DIR, Recommender
+from recommender.metrics import REGISTRY, start_http_server
+from recommender.posters import PosterStore
+from recommender.snapshot import DEFAULT_DIR as SNAPSHOT_DIR, SnapshotClient, part_paths
+from recommender.tmdb import TMDBClient
 
 # --- Setup Logging ---
-logging.basicConfig(level=logging.DEBUG)
+# INFO by default: per-fetch debug lines are too costly to leave on; timings go to the metrics below.
+logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO').upper())
 logger = logging.getLogger(__name__)
+run_started = time.perf_counter()
 
 # --- Set page config ---
 st.set_page_config(page_title="🎬 Netflix-style Movie Recommender", layout="wide")
 
+# --- Metrics ---
+# Section and fetch timings, TMDB call counts and cache hit ratios for this
+# process, served as Prometheus text on /metrics (JSON on /metrics.json).
+METRICS_PORT = int(os.environ.get('METRICS_PORT', 0))
+
+@st.cache_resource
+def start_metrics_server():
+    return start_http_server(METRICS_PORT) if METRICS_PORT else None
+
+start_metrics_server()
+
 # --- Initialize Session State ---
 if 'watchlist' not in st.session_state:
     st.session_state.watchlist = []
+if 'watchlist_recommendations' not in st.session_state:
+    st.session_state.watchlist_recommendations = []
 if 'show_watchlist' not in st.session_state:
     st.session_state.show_watchlist = False
 if 'show_chatbot' not in st.session_state:
@@ -24,6 +46,10 @@ if 'profile_mode' not in st.session_state:
     st.session_state.profile_mode = "Adult"
 if 'chatbot_option' not in st.session_state:
     st.session_state.chatbot_option = "None"
+if 'random_pick' not in st.session_state:
+    st.session_state.random_pick = None
+if 'recommendations' not in st.session_state:
+    st.session_state.recommendations = []
 
 # --- Sidebar Theme Toggle ---
 theme = st.sidebar.radio("🌓 Choose Theme", ("Default Theme", "Dark Mode", "Light Mode"))
@@ -191,10 +217,17 @@ st.markdown(
 )
 
 # --- Load dataset ---
+@st.cache_resource
+@REGISTRY.timed('app_call_seconds', function='load_recommender')
+def load_recommender(path=ARTIFACT_DIR):
+    # Shared by every session in this process; the arrays are memory-mapped,
+    # so other processes on the host share the same pages.
+    return Recommender.load(path)
+
 try:
-    logger.debug("Loading movie_data.pkl")
-    with open('movie_data.pkl', 'rb') as file:
-        movies, cosine_sim = pickle.load(file)
+    logger.debug(f"Loading catalog from {ARTIFACT_DIR}")
+    engine = load_recommender()
+    catalog, movies = engine.catalog, engine.movies
     required_columns = ['title', 'movie_id', 'genres', 'release_year']
     if not all(col in movies.columns for col in required_columns):
         st.error(f"Dataset missing required columns: {', '.join(set(required_columns) - set(movies.columns))}")
@@ -202,8 +235,8 @@ try:
         st.stop()
     logger.debug(f"Dataset loaded successfully. Shape: {movies.shape}")
 except FileNotFoundError:
-    st.error("Error: movie_data.pkl not found. Please ensure the file is in the correct directory.")
-    logger.error("movie_data.pkl not found")
+    st.error(f"Error: neither {ARTIFACT_DIR}/ nor movie_data.pkl was found. Please ensure the dataset is in the correct directory.")
+    logger.error("Dataset not found")
     st.stop()
 except Exception as e:
     st.error(f"Error loading dataset: {str(e)}")
@@ -211,362 +244,333 @@ except Exception as e:
     st.stop()
 
 # --- Functions ---
-def get_recommendations(title, cosine_sim=cosine_sim):
+@REGISTRY.timed('app_call_seconds', function='get_recommendations')
+def get_recommendations(title, eligible=None):
+    # `eligible` is the boolean row mask built from the profile and sidebar filters.
     try:
-        if st.session_state.profile_mode == "Kids":
-            animation_movies = movies[movies['genres'].str.contains("Animation", case=False, na=False)]
-            if animation_movies.empty:
+        if eligible is not None and not eligible.any():
+            if st.session_state.profile_mode == "Kids":
                 st.warning("No Animation movies found in the dataset.")
                 logger.warning("No Animation movies in dataset")
-                return pd.DataFrame()
-            idx = movies[movies['title'] == title].index[0]
-            sim_scores = list(enumerate(cosine_sim[idx]))
-            animation_indices = animation_movies.index
-            sim_scores = [score for score in sim_scores if score[0] in animation_indices]
-            sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)[:10]
-            movie_indices = [i[0] for i in sim_scores]
-            recommendations = movies.iloc[movie_indices]
-            if len(recommendations) < 10:
-                st.warning(f"Only {len(recommendations)} Animation movies available for recommendation.")
-            logger.debug(f"Kids recommendations for {title}: {len(recommendations)} movies")
-            return recommendations
-        else:
-            idx = movies[movies['title'] == title].index[0]
-            sim_scores = list(enumerate(cosine_sim[idx]))
-            sim_scores = sorted(sim_scores, key=lambda x: x[1], reverse=True)[1:11]
-            movie_indices = [i[0] for i in sim_scores]
-            recommendations = movies.iloc[movie_indices]
-            logger.debug(f"Adult recommendations for {title}: {len(recommendations)} movies")
-            return recommendations
+            else:
+                st.warning("No movies match the current filters.")
+                logger.warning("No movies match the current filters")
+            return pd.DataFrame()
+        recommendations = engine.recommend(title, k=10, mask=eligible)
+        if st.session_state.profile_mode == "Kids" and len(recommendations) < 10:
+            st.warning(f"Only {len(recommendations)} Animation movies available for recommendation.")
+        logger.debug(f"{st.session_state.profile_mode} recommendations for {title}: {len(recommendations)} movies")
+        return recommendations
     except (IndexError, KeyError) as e:
         logger.error(f"Recommendation error for {title}: {str(e)}")
         return pd.DataFrame()
 
-@st.cache_data
+# Offline mode renders only from the local snapshot written by
+# `python -m recommender.hydrate`; nothing is fetched from TMDB.
+OFFLINE = os.environ.get('MOVIE_APP_OFFLINE', '').lower() in ('1', 'true', 'yes')
+
+@st.cache_resource
+def get_tmdb_client():
+    if OFFLINE:
+        return SnapshotClient()
+    # One pooled session per process, shared by every session's reruns. The
+    # disk cache behind it is shared by every process on the host. While TMDB
+    # is failing, a local snapshot (if one was hydrated) answers instead.
+    fallback = SnapshotClient() if part_paths(SNAPSHOT_DIR) else None
+    return TMDBClient(cache=DiskCache(), fallback=fallback)
+
+@REGISTRY.timed('app_call_seconds', function='fetch_movie_details')
 def fetch_movie_details(movie_id):
-    try:
-        api_key = '5c35b598fd61fbe662ae2f088ac68559'
-        url = f'https://api.themoviedb.org/3/movie/{movie_id}?api_key={api_key}'
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch details for movie_id {movie_id}: {str(e)}")
-        return None
+    # Details, videos and credits arrive in a single request.
+    return get_tmdb_client().movie(movie_id)
 
+@REGISTRY.timed('app_call_seconds', function='fetch_movie_batch')
+def fetch_movie_batch(movie_ids):
+    # The request a card face needs for its poster also brings videos and credits,
+    # under the same cache entry as fetch_movie_details, so opening the card later
+    # costs no second TMDB call.
+    return get_tmdb_client().fetch_many(movie_ids, kinds=('details', 'videos', 'credits'))
+
+@REGISTRY.timed('app_call_seconds', function='fetch_trending_movies')
 def fetch_trending_movies():
-    try:
-        api_key = '5c35b598fd61fbe662ae2f088ac68559'
-        url = f'https://api.themoviedb.org/3/trending/movie/week?api_key={api_key}'
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        return response.json()['results']
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch trending movies: {str(e)}")
-        return []
-
-@st.cache_data
-def fetch_movie_credits(movie_id):
-    try:
-        api_key = '5c35b598fd61fbe662ae2f088ac68559'
-        url = f'https://api.themoviedb.org/3/movie/{movie_id}/credits?api_key={api_key}'
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        return response.json().get('cast', [])[:3]
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch credits for movie_id {movie_id}: {str(e)}")
-        return []
-
-@st.cache_data
-def fetch_movie_trailer(movie_id):
-    try:
-        api_key = '5c35b598fd61fbe662ae2f088ac68559'
-        url = f'https://api.themoviedb.org/3/movie/{movie_id}/videos?api_key={api_key}'
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        videos = response.json().get('results', [])
-        for video in videos:
-            if video['site'] == 'YouTube' and video['type'] == 'Trailer':
-                return f"https://www.youtube.com/watch?v={video['key']}"
-        return None
-    except requests.RequestException as e:
-        logger.error(f"Failed to fetch trailer for movie_id {movie_id}: {str(e)}")
-        return None
+    return get_tmdb_client().trending()
 
-# --- App Layout ---
-logger.debug("Rendering app layout")
-st.title('🎬 Your Next Binge!')
+@st.cache_resource
+def get_poster_store():
+    # Resized thumbnails on local disk, shared by every session and process;
+    # offline, only posters already on disk are shown.
+    return PosterStore(offline=OFFLINE)
 
-# 2. Trending Now Section
-st.subheader('🔥 Trending Now')
-trending = fetch_trending_movies()
-if trending:
-    trend_cols = st.columns(5)
-    for idx, movie in enumerate(trending[:5]):
-        with trend_cols[idx]:
-            poster_path = movie.get('poster_path')
-            poster_url = f"https://image.tmdb.org/t/p/w500{poster_path}" if poster_path else "https://via.placeholder.com/500x750?text=No+Image"
-            title = movie.get('title', 'Unknown Title')
-            overview = movie.get('overview', 'No overview available.')
-            imdb_id = movie.get('imdb_id')
-            imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "https://www.imdb.com/"
-            st.image(poster_url, use_container_width=True)
-            st.markdown(f"<p><strong>{title}</strong></p>", unsafe_allow_html=True)
-            with st.expander(f"More about {title}"):
-                st.write(f"Overview: {overview}")
-                st.markdown(f"[👉 Visit IMDb Page]({imdb_url})", unsafe_allow_html=True)
-                trailer_url = fetch_movie_trailer(movie.get('id'))
-                if trailer_url:
-                    st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
-                else:
-                    st.write("No trailer available.")
-else:
-    st.warning("Unable to fetch trending movies.")
+@REGISTRY.timed('app_call_seconds', function='fetch_posters')
+def fetch_posters(poster_paths):
+    # Every poster a section shows, downloaded concurrently on a miss.
+    return get_poster_store().images(poster_paths)
 
-st.markdown("---")
+def poster_image(posters, poster_path):
+    return posters.get(poster_path) or get_poster_store().placeholder
 
-# 3. Random Movie Button
-if st.button("🎲 Pick a Random Movie", key="random_movie"):
-    filtered_movies = movies.copy()
-    if st.session_state.profile_mode == "Kids":
-        filtered_movies = filtered_movies[filtered_movies['genres'].str.contains("Animation", case=False, na=False)]
-    if not filtered_movies.empty:
-        random_movie = filtered_movies.sample(1).iloc[0]
-        st.subheader(f"🎬 Random Pick: {random_movie['title']}")
-        details = fetch_movie_details(random_movie['movie_id'])
-        poster_url = (f"https://image.tmdb.org/t/p/w500{details.get('poster_path')}"
-                      if details and details.get('poster_path')
-                      else "https://via.placeholder.com/500x750?text=No+Image")
-        st.image(poster_url, use_container_width=True)
-        st.markdown(f"<p><strong>{random_movie['title']}</strong></p>", unsafe_allow_html=True)
-        with st.expander(f"More about {random_movie['title']}"):
-            overview = details.get('overview', 'No overview available.') if details else 'No overview available.'
-            release_date = details.get('release_date', 'Unknown') if details else 'Unknown'
-            rating = details.get('vote_average', 'N/A') if details else 'N/A'
-            runtime = details.get('runtime', 'N/A') if details else 'N/A'
-            genres = ', '.join([g['name'] for g in details.get('genres', [])]) if details else 'N/A'
-            imdb_id = details.get('imdb_id') if details else None
-            imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "#"
-            st.write(f"Overview: {overview}")
-            st.write(f"Release Date: {release_date}")
-            st.write(f"Rating: ⭐ {rating}")
-            st.write(f"Runtime: {runtime} min")
-            st.write(f"Genres: {genres}")
-            st.markdown(f"[👉 IMDb Page]({imdb_url})", unsafe_allow_html=True)
-            trailer_url = fetch_movie_trailer(random_movie['movie_id'])
-            if trailer_url:
-                st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
-            else:
-                st.write("No trailer available.")
-        if st.button(f"➕ Add to Watchlist", key=f"add_random_{random_movie['movie_id']}"):
-            st.session_state.watchlist.append({
-                'title': random_movie['title'],
-                'poster_url': poster_url
-            })
-            st.success(f"✅ {random_movie['title']} added to your Watchlist!")
-    else:
-        st.warning("No movies available for random selection.")
+# --- View model ---
+@REGISTRY.timed('app_call_seconds', function='get_view_model')
+@st.cache_resource(max_entries=256)
+def get_view_model(profile, genre, year_range):
+    # Everything the filtered sections need for one (profile, genre, years)
+    # combination. It is read-only and shared by every session, so a hit
+    # costs neither a copy nor any catalog work.
+    eligible = engine.filter_mask(profile, genre, year_range)
+    eligible.flags.writeable = False
+    # Newest six from the year-sorted index: a walk that stops at six, not a sort.
+    picks = engine.newest(6, year_range=year_range, mask=eligible)
+    return {
+        'eligible': eligible,
+        'picks': picks.to_dict('records'),
+    }
 
-st.markdown("---")
+# Titles offered for what has been typed into the movie search.
+SEARCH_RESULTS = 20
+# Cards after an opened one whose details are fetched in the background.
+PREFETCH_NEXT = 2
 
-# 4. Sidebar Filters
-st.sidebar.header('👤 Profile')
-profile_mode = st.sidebar.radio("Select Profile:", ["Kids", "Adult"], index=0 if st.session_state.profile_mode == "Kids" else 1)
-st.session_state.profile_mode = profile_mode
+@st.cache_resource
+def get_release_years():
+    return sorted(movies['release_year'].dropna().astype(int).unique())
 
-st.sidebar.header('🎯 Filters')
-genres_available = ['All'] + sorted(list(set(genre for sublist in movies['genres'].str.split() for genre in sublist)))
-selected_genre = st.sidebar.selectbox('Select Genre', genres_available)
-selected_year = st.sidebar.slider('Select Release Year', 1980, 2024, (2000, 2024))
+# Unrated watchlist items (slider left at 0) weigh as much as a middling rating.
+DEFAULT_RATING = 5
 
-# Watchlist Toggle Button
-if st.sidebar.button("🎯 Your Perfect Watchlist", key="watchlist_toggle"):
-    st.session_state.show_watchlist = not st.session_state.show_watchlist
+def add_to_watchlist(movie_id, title, key=None):
+    movie_id = int(movie_id)
+    if any(item['movie_id'] == movie_id for item in st.session_state.watchlist):
+        st.info(f"{title} is already in your Watchlist.")
+        return
+    st.session_state.watchlist.append({
+        'movie_id': movie_id,
+        'title': title,
+        # The card's face fetched this movie already, so this is a cache hit.
+        'poster_path': tmdb.poster_path(fetch_movie_details(movie_id))
+    })
+    # Add buttons live in other fragments than the watchlist, so rerun the whole
+    # page for it to show the new movie; the card shows the message after that run.
+    st.session_state.watchlist_notice = (key, f"✅ {title} added to your Watchlist!")
+    st.rerun()
 
-# 5. Movie Selection and Recommendations
-filtered_movies = movies.copy()
-if st.session_state.profile_mode == "Kids":
-    filtered_movies = filtered_movies[filtered_movies['genres'].str.contains("Animation", case=False, na=False)]
-if selected_genre != 'All':
-    filtered_movies = filtered_movies[filtered_movies['genres'].str.contains(selected_genre, case=False, na=False)]
-filtered_movies = filtered_movies[
-    (filtered_movies['release_year'] >= selected_year[0]) &
-    (filtered_movies['release_year'] <= selected_year[1])
-]
-
-# Default recommendations for Kids profile
-if st.session_state.profile_mode == "Kids":
-    st.subheader("🎬 Recommended Kids Movies")
-    kids_movies = filtered_movies.sort_values(by='release_year', ascending=False).head(6)
-    if not kids_movies.empty:
-        cols = st.columns(3)
-        for idx, movie in enumerate(kids_movies.iterrows()):
-            movie_title = movie[1]['title']
-            movie_id = movie[1]['movie_id']
-            details = fetch_movie_details(movie_id)
-            with cols[idx % 3]:
-                poster_url = (f"https://image.tmdb.org/t/p/w500{details.get('poster_path')}"
-                              if details and details.get('poster_path')
-                              else "https://via.placeholder.com/500x750?text=No+Image")
-                st.image(poster_url, use_container_width=True)
-                st.markdown(f"<p><strong>{movie_title}</strong></p>", unsafe_allow_html=True)
-                st.markdown(f"<p>Genres: {movie[1]['genres']}</p>", unsafe_allow_html=True)
-                st.markdown(f"<p>Release Year: {movie[1]['release_year']}</p>", unsafe_allow_html=True)
-                with st.expander(f"More about {movie_title}"):
-                    overview = details.get('overview', 'No overview available.') if details else 'No overview available.'
-                    release_date = details.get('release_date', 'Unknown') if details else 'Unknown'
-                    rating = details.get('vote_average', 'N/A') if details else 'N/A'
-                    runtime = details.get('runtime', 'N/A') if details else 'N/A'
-                    genres = ', '.join([g['name'] for g in details.get('genres', [])]) if details else movie[1]['genres']
-                    imdb_id = details.get('imdb_id') if details else None
-                    imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "#"
-                    st.write(f"Overview: {overview}")
-                    st.write(f"Release Date: {release_date}")
-                    st.write(f"Rating: ⭐ {rating}")
-                    st.write(f"Runtime: {runtime} min")
-                    st.write(f"Genres: {genres}")
-                    st.markdown(f"[👉 IMDb Page]({imdb_url})", unsafe_allow_html=True)
-                    trailer_url = fetch_movie_trailer(movie_id)
-                    if trailer_url:
-                        st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
-                    else:
-                        st.write("No trailer available.")
-                if st.button(f"➕ Add to Watchlist", key=f"add_kids_{movie_id}_{idx}"):
-                    st.session_state.watchlist.append({
-                        'title': movie_title,
-                        'poster_url': poster_url
-                    })
-                    st.success(f"✅ {movie_title} added to your Watchlist!")
+def remove_from_watchlist(movie_id):
+    st.session_state.watchlist = [item for item in st.session_state.watchlist if item['movie_id'] != movie_id]
+
+def clear_watchlist():
+    st.session_state.watchlist = []
+    st.session_state.watchlist_recommendations = []
+
+def drop_stale_results(name, filters, empty):
+    # Results kept in the session were computed under the sidebar filters of the
+    # time; once those change (e.g. Adult to Kids) they must not be shown any more.
+    if st.session_state.get(f"{name}_filters") != filters:
+        st.session_state[name] = empty
+        st.session_state[f"{name}_filters"] = filters
+
+def recommend_from_watchlist(eligible, filters):
+    # One weighted query over every watchlist movie, rated ones counting more.
+    movie_ids = [item['movie_id'] for item in st.session_state.watchlist]
+    weights = [st.session_state.get(f"rate_{movie_id}", 0) or DEFAULT_RATING for movie_id in movie_ids]
+    recommendations = engine.recommend_from_ids(movie_ids, weights, k=6, mask=None if eligible.all() else eligible)
+    logger.debug(f"Watchlist recommendations from {len(movie_ids)} seeds: {len(recommendations)} movies")
+    st.session_state.watchlist_recommendations = recommendations.to_dict('records')
+    st.session_state.watchlist_recommendations_filters = filters
+
+def prefetch_next(key, next_ids):
+    # Whoever opens one card tends to open the next ones too. As a change
+    # callback this runs once when the card is opened, not on every rerun.
+    if st.session_state[key] and next_ids:
+        get_tmdb_client().prefetch(next_ids)
+
+def render_movie_details(movie_id, title, key, genres=None, next_ids=()):
+    # Overview, rating, runtime, cast and trailer are shown only once the card
+    # is opened, so a page of cards never waits on details nobody reads.
+    if not st.toggle(f"More about {title}", key=f"more_{key}", on_change=prefetch_next,
+                     args=(f"more_{key}", tuple(next_ids))):
+        return
+    details = fetch_movie_details(movie_id)
+    with st.container(border=True):
+        overview = details.get('overview', 'No overview available.') if details else 'No overview available.'
+        release_date = details.get('release_date', 'Unknown') if details else 'Unknown'
+        rating = details.get('vote_average', 'N/A') if details else 'N/A'
+        runtime = details.get('runtime', 'N/A') if details else 'N/A'
+        genres = ', '.join([g['name'] for g in details.get('genres', [])]) if details else (genres or 'N/A')
+        cast = ', '.join(member['name'] for member in tmdb.top_cast(details))
+        imdb_id = details.get('imdb_id') if details else None
+        imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "#"
+        st.write(f"Overview: {overview}")
+        st.write(f"Release Date: {release_date}")
+        st.write(f"Rating: ⭐ {rating}")
+        st.write(f"Runtime: {runtime} min")
+        st.write(f"Genres: {genres}")
+        if cast:
+            st.write(f"Cast: {cast}")
+        st.markdown(f"[👉 IMDb Page]({imdb_url})", unsafe_allow_html=True)
+        trailer_url = tmdb.trailer_url(details)
+        if trailer_url:
+            st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
+        else:
+            st.write("No trailer available.")
+
+def render_movie_card(movie, key, next_ids=()):
+    # A catalog movie drawn from local fields, its details on demand, and an add
+    # button. The poster goes into the returned slot once it has been fetched.
+    movie_title = movie['title']
+    poster_slot = st.empty()
+    st.markdown(f"<p><strong>{movie_title}</strong></p>", unsafe_allow_html=True)
+    st.markdown(f"<p>Genres: {movie['genres']}</p>", unsafe_allow_html=True)
+    st.markdown(f"<p>Release Year: {movie['release_year']}</p>", unsafe_allow_html=True)
+    render_movie_details(movie['movie_id'], movie_title, key, movie['genres'], next_ids)
+    if st.button(f"➕ Add to Watchlist", key=key):
+        add_to_watchlist(movie['movie_id'], movie_title, key)
+    notice = st.session_state.get('watchlist_notice')
+    if notice and notice[0] == key:
+        st.success(notice[1])
+        del st.session_state.watchlist_notice
+    return poster_slot
+
+def render_movie_grid(rows, key_prefix):
+    # Catalog movies, three per row. Card faces are drawn first; the posters
+    # follow from one batched TMDB fetch, so first paint never waits on TMDB.
+    cols = st.columns(3)
+    movie_ids = [movie['movie_id'] for movie in rows]
+    slots = []
+    for idx, movie in enumerate(rows):
+        with cols[idx % 3]:
+            slots.append(render_movie_card(movie, key=f"{key_prefix}_{movie['movie_id']}_{idx}",
+                                           next_ids=movie_ids[idx + 1:idx + 1 + PREFETCH_NEXT]))
+    details_by_id = fetch_movie_batch(tuple(movie_ids))
+    poster_paths = [tmdb.poster_path(details_by_id.get(movie_id)) for movie_id in movie_ids]
+    posters = fetch_posters(poster_paths)
+    for slot, poster_path in zip(slots, poster_paths):
+        slot.image(poster_image(posters, poster_path), use_container_width=True)
+
+# --- Sections ---
+# Each section is a fragment: a widget inside it reruns only that section,
+# not the whole page, so e.g. rating a watchlist item never touches the
+# catalog or TMDB. Sidebar widgets live outside the fragments and still
+# rerun the full page.
+
+@st.fragment
+@REGISTRY.timed('app_section_seconds', section='trending')
+def render_trending():
+    st.subheader('🔥 Trending Now')
+    trending = fetch_trending_movies()
+    if trending:
+        trend_cols = st.columns(5)
+        # The trending list already has titles and posters; nothing else is fetched up front.
+        trending_ids = [movie.get('id') for movie in trending[:5] if movie.get('id')]
+        posters = fetch_posters([movie.get('poster_path') for movie in trending[:5]])
+        for idx, movie in enumerate(trending[:5]):
+            with trend_cols[idx]:
+                title = movie.get('title', 'Unknown Title')
+                st.image(poster_image(posters, movie.get('poster_path')), use_container_width=True)
+                st.markdown(f"<p><strong>{title}</strong></p>", unsafe_allow_html=True)
+                if movie.get('id'):
+                    position = trending_ids.index(movie['id'])
+                    render_movie_details(movie['id'], title, f"trending_{movie['id']}",
+                                         next_ids=trending_ids[position + 1:position + 1 + PREFETCH_NEXT])
     else:
-        st.warning("No Animation movies available for recommendation.")
-
-# Default recommendations for Adult profile
-if st.session_state.profile_mode == "Adult":
-    st.subheader("🎬 Recommended Adult Movies")
-    adult_movies = filtered_movies.sort_values(by='release_year', ascending=False).head(6)
-    if not adult_movies.empty:
-        cols = st.columns(3)
-        for idx, movie in enumerate(adult_movies.iterrows()):
-            movie_title = movie[1]['title']
-            movie_id = movie[1]['movie_id']
-            details = fetch_movie_details(movie_id)
-            with cols[idx % 3]:
-                poster_url = (f"https://image.tmdb.org/t/p/w500{details.get('poster_path')}"
-                              if details and details.get('poster_path')
-                              else "https://via.placeholder.com/500x750?text=No+Image")
-                st.image(poster_url, use_container_width=True)
-                st.markdown(f"<p><strong>{movie_title}</strong></p>", unsafe_allow_html=True)
-                st.markdown(f"<p>Genres: {movie[1]['genres']}</p>", unsafe_allow_html=True)
-                st.markdown(f"<p>Release Year: {movie[1]['release_year']}</p>", unsafe_allow_html=True)
-                with st.expander(f"More about {movie_title}"):
-                    overview = details.get('overview', 'No overview available.') if details else 'No overview available.'
-                    release_date = details.get('release_date', 'Unknown') if details else 'Unknown'
-                    rating = details.get('vote_average', 'N/A') if details else 'N/A'
-                    runtime = details.get('runtime', 'N/A') if details else 'N/A'
-                    genres = ', '.join([g['name'] for g in details.get('genres', [])]) if details else movie[1]['genres']
-                    imdb_id = details.get('imdb_id') if details else None
-                    imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "#"
-                    st.write(f"Overview: {overview}")
-                    st.write(f"Release Date: {release_date}")
-                    st.write(f"Rating: ⭐ {rating}")
-                    st.write(f"Runtime: {runtime} min")
-                    st.write(f"Genres: {genres}")
-                    st.markdown(f"[👉 IMDb Page]({imdb_url})", unsafe_allow_html=True)
-                    trailer_url = fetch_movie_trailer(movie_id)
-                    if trailer_url:
-                        st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
-                    else:
-                        st.write("No trailer available.")
-                if st.button(f"➕ Add to Watchlist", key=f"add_adult_{movie_id}_{idx}"):
-                    st.session_state.watchlist.append({
-                        'title': movie_title,
-                        'poster_url': poster_url
-                    })
-                    st.success(f"✅ {movie_title} added to your Watchlist!")
+        st.warning("Unable to fetch trending movies.")
+
+@st.fragment
+@REGISTRY.timed('app_section_seconds', section='random_pick')
+def render_random_pick(profile):
+    # The pick only follows the profile, not the genre and year filters.
+    drop_stale_results('random_pick', (profile,), None)
+    if st.button("🎲 Pick a Random Movie", key="random_movie"):
+        filtered_movies = movies[engine.filter_mask(profile)]
+        if not filtered_movies.empty:
+            # Kept in the session so opening the card's details does not lose the pick.
+            st.session_state.random_pick = filtered_movies.sample(1).iloc[0].to_dict()
+        else:
+            st.session_state.random_pick = None
+            st.warning("No movies available for random selection.")
+    random_movie = st.session_state.random_pick
+    if random_movie:
+        st.subheader(f"🎬 Random Pick: {random_movie['title']}")
+        poster_slot = render_movie_card(random_movie, key=f"add_random_{random_movie['movie_id']}")
+        poster_path = tmdb.poster_path(fetch_movie_details(random_movie['movie_id']))
+        poster_slot.image(get_poster_store().image(poster_path), use_container_width=True)
+
+@st.fragment
+@REGISTRY.timed('app_section_seconds', section='default_picks')
+def render_default_picks(profile, genre, year_range):
+    view = get_view_model(profile, genre, year_range)
+    if profile == "Kids":
+        st.subheader("🎬 Recommended Kids Movies")
+        if view['picks']:
+            render_movie_grid(view['picks'], 'add_kids')
+        else:
+            st.warning("No Animation movies available for recommendation.")
     else:
-        st.warning("No movies available for recommendation.")
-
-# Movie selection for manual recommendations
-selected_movie = st.selectbox('🎥 Select a Movie:', filtered_movies['title'].values if not filtered_movies.empty else ["No movies available"])
-
-if st.button('Recommend Similar Movies', key="recommend_button"):
-    with st.spinner('🍿 Finding the best movies for you...'):
-        if selected_movie != "No movies available":
-            recommendations = get_recommendations(selected_movie)
-            if not recommendations.empty:
-                st.subheader("🎬 Recommended Movies")
-                cols = st.columns(3)
-                for idx, movie in enumerate(recommendations.iterrows()):
-                    movie_title = movie[1]['title']
-                    movie_id = movie[1]['movie_id']
-                    details = fetch_movie_details(movie_id)
-                    if details:
-                        poster_path = details.get('poster_path')
-                        poster_url = f"https://image.tmdb.org/t/p/w500{poster_path}" if poster_path else "https://via.placeholder.com/500x750?text=No+Image"
-                        overview = details.get('overview', 'No overview available.')
-                        release_date = details.get('release_date', 'Unknown')
-                        rating = details.get('vote_average', 'N/A')
-                        runtime = details.get('runtime', 'N/A')
-                        genres = ', '.join([g['name'] for g in details.get('genres', [])]) if details else movie[1]['genres']
-                        imdb_id = details.get('imdb_id')
-                        imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "#"
-                        with cols[idx % 3]:
-                            st.image(poster_url, use_container_width=True)
-                            st.markdown(f"<p><strong>{movie_title}</strong></p>", unsafe_allow_html=True)
-                            st.markdown(f"<p>Genres: {genres}</p>", unsafe_allow_html=True)
-                            st.markdown(f"<p>Runtime: {runtime} min</p>", unsafe_allow_html=True)
-                            with st.expander(f"More about {movie_title}"):
-                                st.write(f"Overview: {overview}")
-                                st.write(f"Release Date: {release_date}")
-                                st.write(f"Rating: ⭐ {rating}")
-                                st.write(f"Genres: {genres}")
-                                st.markdown(f"[👉 IMDb Page]({imdb_url})", unsafe_allow_html=True)
-                                trailer_url = fetch_movie_trailer(movie_id)
-                                if trailer_url:
-                                    st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
-                                else:
-                                    st.write("No trailer available.")
-                            if st.button(f"➕ Add to Watchlist", key=f"add_recommend_{movie_id}{idx}{uuid.uuid4()}"):
-                                st.session_state.watchlist.append({
-                                    'title': movie_title,
-                                    'poster_url': poster_url
-                                })
-                                st.success(f"✅ {movie_title} added to your Watchlist!")
-            else:
-                st.warning("No recommendations found for the selected movie.")
+        st.subheader("🎬 Recommended Adult Movies")
+        if view['picks']:
+            render_movie_grid(view['picks'], 'add_adult')
         else:
-            st.warning("Please select a valid movie.")
+            st.warning("No movies available for recommendation.")
 
-st.markdown("---")
+@st.fragment
+@REGISTRY.timed('app_section_seconds', section='recommendations')
+def render_recommendations(profile, genre, year_range):
+    view = get_view_model(profile, genre, year_range)
+    # Only the best matches for the typed text reach the browser, not the
+    # whole filtered catalog; an empty search offers the most popular titles.
+    query = st.text_input('🔎 Search for a movie:', key="movie_search", placeholder="Start typing a title, e.g. dark knight")
+    matches = engine.search_titles(query, SEARCH_RESULTS, mask=view['eligible'])['title'].tolist()
+    if query and not matches:
+        st.info(f"No movies match \"{query}\".")
+    selected_movie = st.selectbox('🎥 Select a Movie:', matches if matches else ["No movies available"])
 
-# 6. Display Watchlist if Toggled
-if st.session_state.show_watchlist:
+    drop_stale_results('recommendations', (profile, genre, tuple(year_range)), [])
+    if st.button('Recommend Similar Movies', key="recommend_button"):
+        with st.spinner('🍿 Finding the best movies for you...'):
+            if selected_movie != "No movies available":
+                recommendations = get_recommendations(selected_movie, view['eligible'])
+                # Kept in the session so opening a card's details does not lose the results.
+                st.session_state.recommendations = recommendations.to_dict('records')
+                if recommendations.empty:
+                    st.warning("No recommendations found for the selected movie.")
+            else:
+                st.warning("Please select a valid movie.")
+    if st.session_state.recommendations:
+        st.subheader("🎬 Recommended Movies")
+        render_movie_grid(st.session_state.recommendations, 'add_recommend')
+
+@st.fragment
+@REGISTRY.timed('app_section_seconds', section='watchlist')
+def render_watchlist(profile, genre, year_range):
     st.subheader('👀 Your Perfect Watchlist:')
     if st.session_state.watchlist:
-        if st.button("🗑 Clear Watchlist", key="clear_watchlist"):
-            st.session_state.watchlist = []
-            st.rerun()
+        # Callbacks run before the fragment reruns, so it renders the new list.
+        st.button("🗑 Clear Watchlist", key="clear_watchlist", on_click=clear_watchlist)
         watch_cols = st.columns(4)
+        posters = fetch_posters([item['poster_path'] for item in st.session_state.watchlist])
         for idx, item in enumerate(st.session_state.watchlist):
+            movie_id = item['movie_id']
             with watch_cols[idx % 4]:
-                st.image(item['poster_url'], use_container_width=True)
+                st.image(poster_image(posters, item['poster_path']), use_container_width=True)
                 st.markdown(f"<p><strong>{item['title']}</strong></p>", unsafe_allow_html=True)
-                st.slider(f"Rate {item['title']}", 0, 10, key=f"rate_{idx}")
-                st.text_input(f"Note for {item['title']}", key=f"note_{idx}")
-                if st.button("🗑 Remove", key=f"remove_watchlist_{idx}"):
-                    st.session_state.watchlist.pop(idx)
-                    st.rerun()
+                st.slider(f"Rate {item['title']}", 0, 10, key=f"rate_{movie_id}")
+                st.text_input(f"Note for {item['title']}", key=f"note_{movie_id}")
+                st.button("🗑 Remove", key=f"remove_watchlist_{movie_id}", on_click=remove_from_watchlist, args=(movie_id,))
+        view = get_view_model(profile, genre, year_range)
+        filters = (profile, genre, tuple(year_range))
+        drop_stale_results('watchlist_recommendations', filters, [])
+        st.button("✨ Recommend from my Watchlist", key="watchlist_recommend",
+                  on_click=recommend_from_watchlist, args=(view['eligible'], filters))
+        if st.session_state.watchlist_recommendations:
+            st.subheader("🎬 Because you saved these")
+            render_movie_grid(st.session_state.watchlist_recommendations, 'add_watchlist_recommend')
         if st.button("📥 Download Watchlist as CSV", key="download_watchlist"):
             df_watchlist = pd.DataFrame(st.session_state.watchlist)
             st.download_button("Download CSV", data=df_watchlist.to_csv(index=False), file_name="watchlist.csv", key="download_csv")
     else:
         st.info("Your watchlist is currently empty. Add some favorites to get started! 🎬")
 
-st.markdown("---")
-
-# 7. Chatbot Popup with Heading
-st.subheader("🎬 Watch by Your Preference")
-if st.session_state.show_chatbot:
+@st.fragment
+@REGISTRY.timed('app_section_seconds', section='chatbot')
+def render_chatbot():
     with st.container():
         st.markdown(
             f"""
@@ -594,148 +598,83 @@ if st.session_state.show_chatbot:
                 st.session_state.chatbot_option = "None"
 
         if st.session_state.chatbot_option == "Genres":
-            genres_available = sorted(list(set(genre for sublist in movies['genres'].str.split() for genre in sublist)))
-            selected_chatbot_genre = st.selectbox("Select a genre:", ["Choose a genre"] + genres_available, key="chatbot_genre")
+            selected_chatbot_genre = st.selectbox("Select a genre:", ["Choose a genre"] + engine.genres, key="chatbot_genre")
             if selected_chatbot_genre != "Choose a genre":
-                matched_movies = movies[movies['genres'].str.contains(selected_chatbot_genre, case=False, na=False)]
+                matched_movies = engine.movies_in_genre(selected_chatbot_genre)
                 if not matched_movies.empty:
                     st.subheader(f"🎬 Movies in {selected_chatbot_genre}")
-                    cols = st.columns(3)
-                    for idx, movie in matched_movies.head(6).iterrows():
-                        movie_title = movie['title']
-                        movie_id = movie['movie_id']
-                        details = fetch_movie_details(movie_id)
-                        with cols[idx % 3]:
-                            poster_url = (f"https://image.tmdb.org/t/p/w500{details.get('poster_path')}"
-                                         if details and details.get('poster_path')
-                                         else "https://via.placeholder.com/500x750?text=No+Image")
-                            st.image(poster_url, use_container_width=True)
-                            st.markdown(f"<p><strong>{movie_title}</strong></p>", unsafe_allow_html=True)
-                            st.markdown(f"<p>Genres: {movie['genres']}</p>", unsafe_allow_html=True)
-                            st.markdown(f"<p>Release Year: {movie['release_year']}</p>", unsafe_allow_html=True)
-                            with st.expander(f"More about {movie_title}"):
-                                overview = details.get('overview', 'No overview available.') if details else 'No overview available.'
-                                release_date = details.get('release_date', 'Unknown') if details else 'Unknown'
-                                rating = details.get('vote_average', 'N/A') if details else 'N/A'
-                                runtime = details.get('runtime', 'N/A') if details else 'N/A'
-                                genres = ', '.join([g['name'] for g in details.get('genres', [])]) if details else movie['genres']
-                                imdb_id = details.get('imdb_id') if details else None
-                                imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "#"
-                                st.write(f"Overview: {overview}")
-                                st.write(f"Release Date: {release_date}")
-                                st.write(f"Rating: ⭐ {rating}")
-                                st.write(f"Runtime: {runtime} min")
-                                st.write(f"Genres: {genres}")
-                                st.markdown(f"[👉 IMDb Page]({imdb_url})", unsafe_allow_html=True)
-                                trailer_url = fetch_movie_trailer(movie_id)
-                                if trailer_url:
-                                    st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
-                                else:
-                                    st.write("No trailer available.")
-                            if st.button(f"➕ Add to Watchlist", key=f"add_chatbot_genre_{movie_id}_{idx}"):
-                                st.session_state.watchlist.append({
-                                    'title': movie_title,
-                                    'poster_url': poster_url
-                                })
-                                st.success(f"✅ {movie_title} added to your Watchlist!")
+                    render_movie_grid(matched_movies.head(6).to_dict('records'), 'add_chatbot_genre')
                 else:
                     st.warning(f"No movies found for genre: {selected_chatbot_genre}")
         elif st.session_state.chatbot_option == "Cast":
             selected_cast = st.text_input("Enter an actor/actress name:", placeholder="e.g., Tom Hanks", key="chatbot_cast")
             if selected_cast:
                 with st.spinner("Searching for movies..."):
-                    matched_movies = pd.DataFrame()
-                    for _, movie in movies.iterrows():
-                        credits = fetch_movie_credits(movie['movie_id'])
-                        cast_names = [cast['name'] for cast in credits]
-                        if any(selected_cast.lower() in name.lower() for name in cast_names):
-                            matched_movies = pd.concat([matched_movies, movie.to_frame().T], ignore_index=True)
+                    if not len(catalog.people):
+                        st.info("Cast search needs credits in the catalog; rebuild the artifact with --credits or --tmdb-credits.")
+                    matched_movies = engine.movies_with_person(selected_cast)
                     if not matched_movies.empty:
                         st.subheader(f"🎬 Movies with {selected_cast}")
-                        cols = st.columns(3)
-                        for idx, movie in matched_movies.head(6).iterrows():
-                            movie_title = movie['title']
-                            movie_id = movie['movie_id']
-                            details = fetch_movie_details(movie_id)
-                            with cols[idx % 3]:
-                                poster_url = (f"https://image.tmdb.org/t/p/w500{details.get('poster_path')}"
-                                             if details and details.get('poster_path')
-                                             else "https://via.placeholder.com/500x750?text=No+Image")
-                                st.image(poster_url, use_container_width=True)
-                                st.markdown(f"<p><strong>{movie_title}</strong></p>", unsafe_allow_html=True)
-                                st.markdown(f"<p>Genres: {movie['genres']}</p>", unsafe_allow_html=True)
-                                st.markdown(f"<p>Release Year: {movie['release_year']}</p>", unsafe_allow_html=True)
-                                with st.expander(f"More about {movie_title}"):
-                                    overview = details.get('overview', 'No overview available.') if details else 'No overview available.'
-                                    release_date = details.get('release_date', 'Unknown') if details else 'Unknown'
-                                    rating = details.get('vote_average', 'N/A') if details else 'N/A'
-                                    runtime = details.get('runtime', 'N/A') if details else 'N/A'
-                                    genres = ', '.join([g['name'] for g in details.get('genres', [])]) if details else movie['genres']
-                                    imdb_id = details.get('imdb_id') if details else None
-                                    imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "#"
-                                    st.write(f"Overview: {overview}")
-                                    st.write(f"Release Date: {release_date}")
-                                    st.write(f"Rating: ⭐ {rating}")
-                                    st.write(f"Runtime: {runtime} min")
-                                    st.write(f"Genres: {genres}")
-                                    st.markdown(f"[👉 IMDb Page]({imdb_url})", unsafe_allow_html=True)
-                                    trailer_url = fetch_movie_trailer(movie_id)
-                                    if trailer_url:
-                                        st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
-                                    else:
-                                        st.write("No trailer available.")
-                                if st.button(f"➕ Add to Watchlist", key=f"add_chatbot_cast_{movie_id}_{idx}"):
-                                    st.session_state.watchlist.append({
-                                        'title': movie_title,
-                                        'poster_url': poster_url
-                                    })
-                                    st.success(f"✅ {movie_title} added to your Watchlist!")
+                        render_movie_grid(matched_movies.head(6).to_dict('records'), 'add_chatbot_cast')
                     else:
                         st.warning(f"No movies found with cast: {selected_cast}")
         elif st.session_state.chatbot_option == "Year":
-            year_range = sorted(movies['release_year'].dropna().astype(int).unique())
+            year_range = get_release_years()
             selected_year = st.selectbox("Select a release year:", ["Choose a year"] + list(map(str, year_range)), key="chatbot_year_select")
             if selected_year != "Choose a year":
-                matched_movies = movies[movies['release_year'] == int(selected_year)]
+                matched_movies = engine.movies_in_year(int(selected_year))
                 if not matched_movies.empty:
                     st.subheader(f"🎬 Movies from {selected_year}")
-                    cols = st.columns(3)
-                    for idx, movie in matched_movies.head(6).iterrows():
-                        movie_title = movie['title']
-                        movie_id = movie['movie_id']
-                        details = fetch_movie_details(movie_id)
-                        with cols[idx % 3]:
-                            poster_url = (f"https://image.tmdb.org/t/p/w500{details.get('poster_path')}"
-                                         if details and details.get('poster_path')
-                                         else "https://via.placeholder.com/500x750?text=No+Image")
-                            st.image(poster_url, use_container_width=True)
-                            st.markdown(f"<p><strong>{movie_title}</strong></p>", unsafe_allow_html=True)
-                            st.markdown(f"<p>Genres: {movie['genres']}</p>", unsafe_allow_html=True)
-                            st.markdown(f"<p>Release Year: {movie['release_year']}</p>", unsafe_allow_html=True)
-                            with st.expander(f"More about {movie_title}"):
-                                overview = details.get('overview', 'No overview available.') if details else 'No overview available.'
-                                release_date = details.get('release_date', 'Unknown') if details else 'Unknown'
-                                rating = details.get('vote_average', 'N/A') if details else 'N/A'
-                                runtime = details.get('runtime', 'N/A') if details else 'N/A'
-                                genres = ', '.join([g['name'] for g in details.get('genres', [])]) if details else movie['genres']
-                                imdb_id = details.get('imdb_id') if details else None
-                                imdb_url = f"https://www.imdb.com/title/{imdb_id}/" if imdb_id else "#"
-                                st.write(f"Overview: {overview}")
-                                st.write(f"Release Date: {release_date}")
-                                st.write(f"Rating: ⭐ {rating}")
-                                st.write(f"Runtime: {runtime} min")
-                                st.write(f"Genres: {genres}")
-                                st.markdown(f"[👉 IMDb Page]({imdb_url})", unsafe_allow_html=True)
-                                trailer_url = fetch_movie_trailer(movie_id)
-                                if trailer_url:
-                                    st.markdown(f"[🎥 Watch Trailer]({trailer_url})", unsafe_allow_html=True)
-                                else:
-                                    st.write("No trailer available.")
-                            if st.button(f"➕ Add to Watchlist", key=f"add_chatbot_year_{movie_id}_{idx}"):
-                                st.session_state.watchlist.append({
-                                    'title': movie_title,
-                                    'poster_url': poster_url
-                                })
-                                st.success(f"✅ {movie_title} added to your Watchlist!")
+                    render_movie_grid(matched_movies.head(6).to_dict('records'), 'add_chatbot_year')
                 else:
                     st.warning(f"No movies found for year: {selected_year}")
+
+# --- App Layout ---
+logger.debug("Rendering app layout")
+st.title('🎬 Your Next Binge!')
+
+# 1. Sidebar Filters (read first so every section sees this run's values)
+st.sidebar.header('👤 Profile')
+profile_mode = st.sidebar.radio("Select Profile:", ["Kids", "Adult"], index=0 if st.session_state.profile_mode == "Kids" else 1)
+st.session_state.profile_mode = profile_mode
+
+st.sidebar.header('🎯 Filters')
+genres_available = ['All'] + engine.genres
+selected_genre = st.sidebar.selectbox('Select Genre', genres_available)
+selected_year = st.sidebar.slider('Select Release Year', 1980, 2024, (2000, 2024))
+
+# Watchlist Toggle Button
+if st.sidebar.button("🎯 Your Perfect Watchlist", key="watchlist_toggle"):
+    st.session_state.show_watchlist = not st.session_state.show_watchlist
+
+# 2. Trending Now Section
+render_trending()
+
+st.markdown("---")
+
+# 3. Random Movie Button
+render_random_pick(profile_mode)
+
+st.markdown("---")
+
+# 4. Default picks for the profile
+render_default_picks(profile_mode, selected_genre, selected_year)
+
+# 5. Movie selection for manual recommendations
+render_recommendations(profile_mode, selected_genre, selected_year)
+
+st.markdown("---")
+
+# 6. Display Watchlist if Toggled
+if st.session_state.show_watchlist:
+    render_watchlist(profile_mode, selected_genre, selected_year)
+
+st.markdown("---")
+
+# 7. Chatbot Popup with Heading
+st.subheader("🎬 Watch by Your Preference")
+if st.session_state.show_chatbot:
+    render_chatbot()
+
+# Full-page runs only; a fragment rerun is timed by its own section.
+REGISTRY.observe('app_run_seconds', time.perf_counter() - run_started)
@@ -0,0 +1,536 @@
+"""Concurrent-session load test of the Streamlit app against a stub TMDB.
+
+Usage::
+
+    python -m benchmarks.loadtest --sessions 1 5 10 20 --steps 15 --tmdb-latency 0.15
+
+Each concurrency level starts a real ``streamlit run app.py`` server and
+drives it the way browsers do: every simulated session holds its own
+websocket to ``/_stcore/stream``, sends the same rerun requests (widget
+values, and the fragment id for widgets inside an ``st.fragment``) and waits
+for the script run to finish. Sessions run concurrently, each doing a random
+mix of realistic flows (theme toggle, profile switch, searching for and
+picking a movie and "Recommend Similar Movies", the random pick, opening a
+card's details, watchlist edits and chatbot genre/cast/year searches). TMDB (API and poster images) is replaced by a
+local stub server with configurable latency, and every level gets a new
+server whose TMDB and poster caches start empty apart from one warm-up
+page load.
+
+For each level the report has rerun latency percentiles per action and
+overall, reruns per second, stub TMDB requests, and the server's resident
+memory per session. The temporary artifact, caches and Streamlit logs are
+deleted afterwards unless ``--keep-workdir`` is given. The client needs the
+``websockets`` package, which recent Streamlit releases install themselves.
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from benchmarks.run import summarize
+from benchmarks.synthetic import GENRES, synthetic_movies
+
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, 'app.py')
+DEFAULT_SESSIONS = [1, 5, 10, 20]
+DEFAULT_MOVIES = 5000
+TRENDING_SIZE = 20
+RUN_TIMEOUT = 120
+STARTUP_TIMEOUT = 60
+
+
+class StubTMDB:
+    """Local stand-in for the TMDB API and image CDN, with ``latency`` (+- ``jitter``) seconds per request."""
+
+    def __init__(self, movie_ids, latency=0.0, jitter=0.0, seed=0):
+        self.movie_ids = list(movie_ids)
+        self.latency = latency
+        self.jitter = jitter
+        self.requests = 0
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.poster = self._poster()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stub.handle(self)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    @staticmethod
+    def _poster():
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (342, 513), (20, 20, 60)).save(buffer, format='JPEG', quality=85)
+        return buffer.getvalue()
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='tmdb-stub', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def movie(self, movie_id):
+        return {
+            'id': movie_id,
+            'title': f"Synthetic Movie {movie_id - 1}",
+            'overview': "A synthetic movie served by the load-test stub.",
+            'poster_path': f"/poster{movie_id}.jpg",
+            'release_date': '2001-06-01',
+            'vote_average': 7.1,
+            'runtime': 104,
+            'imdb_id': f"tt{movie_id:07d}",
+            'genres': [{'name': GENRES[movie_id % len(GENRES)]}],
+            'videos': {'results': [{'site': 'YouTube', 'type': 'Trailer', 'key': f"stub{movie_id}"}]},
+            'credits': {'cast': [{'name': f"Actor{movie_id} Surname{movie_id}"}]},
+        }
+
+    def handle(self, request):
+        with self.lock:
+            self.requests += 1
+            delay = max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        path = request.path.split('?', 1)[0]
+        content_type = 'application/json'
+        if path.endswith('.jpg'):
+            body, content_type = self.poster, 'image/jpeg'
+        elif path.startswith('/trending/'):
+            body = json.dumps({'results': [self.movie(movie_id) for movie_id in self.movie_ids[:TRENDING_SIZE]]}).encode()
+        elif re.fullmatch(r'/movie/\d+', path):
+            body = json.dumps(self.movie(int(path.rsplit('/', 1)[1]))).encode()
+        else:
+            request.send_response(404)
+            request.send_header('Content-Length', '0')
+            request.end_headers()
+            return
+        request.send_response(200)
+        request.send_header('Content-Type', content_type)
+        request.send_header('Content-Length', str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+
+def build_artifact(n, root, seed=0):
+    """A synthetic catalog of ``n`` movies written to ``root``; returns the movies and cast names."""
+    from recommender.artifact import write_artifact
+    from recommender.catalog import Catalog
+
+    movies = synthetic_movies(n, seed=seed)
+    write_artifact(root, Catalog.from_frame(movies, None), source='loadtest')
+    people = sorted({name for cast in movies['cast'] for name in cast})
+    return movies, people
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def process_rss(pid):
+    """Resident set size of process ``pid`` in bytes, or None where /proc is unavailable."""
+    try:
+        with open(f'/proc/{pid}/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return None
+
+
+class AppServer:
+    """``streamlit run app.py`` in a subprocess, with caches under ``workdir`` and TMDB pointed at ``stub``."""
+
+    def __init__(self, root, stub, workdir):
+        self.port = free_port()
+        self.url = f"ws://127.0.0.1:{self.port}/_stcore/stream"
+        self.log_path = os.path.join(workdir, 'streamlit.log')
+        self.env = dict(
+            os.environ,
+            MOVIE_ARTIFACT_DIR=root,
+            TMDB_BASE_URL=stub.url,
+            TMDB_IMAGE_BASE_URL=stub.url,
+            TMDB_CACHE_PATH=os.path.join(workdir, 'tmdb.sqlite3'),
+            POSTER_CACHE_DIR=os.path.join(workdir, 'posters'),
+        )
+        self.env.pop('METRICS_PORT', None)
+        self.process = None
+
+    def start(self):
+        self.log = open(self.log_path, 'wb')
+        self.process = subprocess.Popen(
+            [sys.executable, '-m', 'streamlit', 'run', APP_PATH, '--server.headless', 'true',
+             '--server.address', '127.0.0.1', '--server.port', str(self.port),
+             '--server.fileWatcherType', 'none', '--browser.gatherUsageStats', 'false'],
+            cwd=ROOT, env=self.env, stdout=self.log, stderr=subprocess.STDOUT,
+        )
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"Streamlit exited with {self.process.returncode}; see {self.log_path} (kept with --keep-workdir)")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{self.port}/_stcore/health", timeout=1) as response:
+                    if response.status == 200:
+                        return self
+            except OSError:
+                time.sleep(0.2)
+        self.stop()
+        raise RuntimeError(f"Streamlit did not start within {STARTUP_TIMEOUT}s; see {self.log_path} (kept with --keep-workdir)")
+
+    def rss(self):
+        return process_rss(self.process.pid)
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+                self.process.wait()
+        self.log.close()
+
+
+class Session:
+    """One simulated browser tab: a websocket to the server, the page it was sent, and the flows it can perform.
+
+    The page is kept as the latest delta per element path and parsed into
+    Streamlit's testing element tree, so flows find widgets by key or label
+    and serialize new values exactly as ``AppTest`` does.
+    """
+
+    def __init__(self, url, seed, people):
+        self.url = url
+        self.rng = random.Random(seed)
+        self.people = people
+        self.samples = []
+        self.deltas = {}
+        self.fragment_of = {}
+        self.cached = {}
+        self.widgets = {}
+        self.page = None
+        self.socket = None
+        self.profile_mode = 'Adult'
+        self.show_watchlist = False
+
+    def rerun(self, action, widget=None):
+        """Send a rerun with the values set so far (plus ``widget``'s new one) and time it."""
+        from streamlit.proto.BackMsg_pb2 import BackMsg
+
+        fragment_id = ''
+        if widget is not None:
+            self.widgets[widget.id] = widget._widget_state
+            fragment_id = self.fragment_of.get(widget.id, '')
+        message = BackMsg()
+        message.rerun_script.query_string = ''
+        message.rerun_script.page_script_hash = ''
+        message.rerun_script.widget_states.widgets.extend(self.widgets.values())
+        if fragment_id:
+            message.rerun_script.fragment_id = fragment_id
+        start = time.perf_counter()
+        self.socket.send(message.SerializeToString())
+        deltas = self.receive()
+        self.samples.append((action, time.perf_counter() - start))
+        # Button clicks fire once; other values persist like they do in the browser.
+        self.widgets = {
+            widget_id: state for widget_id, state in self.widgets.items()
+            if state.WhichOneof('value') not in ('trigger_value', 'string_trigger_value')
+        }
+        self.apply(deltas, fragment_id)
+
+    def receive(self):
+        """Deltas sent until the script run finishes."""
+        from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+        deltas = []
+        while True:
+            message = ForwardMsg()
+            message.ParseFromString(self.socket.recv(timeout=RUN_TIMEOUT))
+            kind = message.WhichOneof('type')
+            if kind == 'ref_hash':
+                # The server only sends a reference for a message it has already sent this session.
+                cached = ForwardMsg()
+                cached.CopyFrom(self.cached[message.ref_hash])
+                cached.metadata.CopyFrom(message.metadata)
+                message, kind = cached, cached.WhichOneof('type')
+            elif message.metadata.cacheable and message.hash:
+                self.cached[message.hash] = message
+            if kind == 'delta':
+                deltas.append(message)
+            elif kind == 'script_finished' and message.script_finished != ForwardMsg.FINISHED_EARLY_FOR_RERUN:
+                return deltas
+
+    def apply(self, deltas, fragment_id=''):
+        from collections import defaultdict
+        from types import SimpleNamespace
+
+        from streamlit.runtime.state.common import TESTING_KEY
+        from streamlit.testing.v1.element_tree import parse_tree_from_messages
+
+        if fragment_id:
+            # A fragment rerun redraws only the block the fragment renders into.
+            blocks = [
+                tuple(delta.metadata.delta_path) for delta in deltas
+                if delta.delta.WhichOneof('type') == 'add_block' and delta.delta.fragment_id == fragment_id
+            ]
+            if blocks:
+                root = min(blocks, key=len)
+                self.deltas = {path: delta for path, delta in self.deltas.items() if path[:len(root)] != root}
+        else:
+            self.deltas = {}
+        for delta in deltas:
+            self.deltas[tuple(delta.metadata.delta_path)] = delta
+            element = delta.delta.new_element
+            kind = element.WhichOneof('type') if delta.delta.WhichOneof('type') == 'new_element' else None
+            if kind == 'exception':
+                raise RuntimeError(element.exception.message)
+            widget_id = getattr(getattr(element, kind), 'id', '') if kind else ''
+            if widget_id:
+                self.fragment_of[widget_id] = delta.delta.fragment_id
+        self.page = parse_tree_from_messages([delta for _, delta in sorted(self.deltas.items())])
+        # Radio and selectbox values are serialized through their format function, which
+        # the tree looks up in the test runner's session state; the labels are already text.
+        self.page._runner = SimpleNamespace(_session_state={TESTING_KEY: defaultdict(lambda: str)})
+
+    def button(self, key):
+        for button in self.page.button:
+            if button.key == key:
+                return button
+        return None
+
+    def open(self):
+        self.rerun('initial_load')
+
+    def theme(self):
+        radio = self.page.sidebar.radio[0]
+        self.rerun('theme_toggle', radio.set_value(self.rng.choice(radio.options)))
+
+    def profile(self):
+        self.profile_mode = 'Kids' if self.profile_mode == 'Adult' else 'Adult'
+        self.rerun('profile_switch', self.page.sidebar.radio[1].set_value(self.profile_mode))
+
+    def movie_select(self):
+        return next((box for box in self.page.selectbox if box.label.startswith('🎥')), None)
+
+    def recommend(self):
+        select = self.movie_select()
+        if select is not None and select.options and select.options[0] != "No movies available":
+            # Type the start of a title into the search, as a user looking for it would.
+            typed = self.rng.choice(select.options)[:self.rng.randint(1, 6)]
+            self.rerun('movie_search', self.page.text_input(key='movie_search').input(typed))
+            select = self.movie_select()
+        if select is not None and select.options and select.options[0] != "No movies available":
+            self.rerun('select_movie', select.set_value(self.rng.choice(select.options)))
+        self.rerun('recommend', self.button('recommend_button').click())
+
+    def random_pick(self):
+        self.rerun('random_pick', self.button('random_movie').click())
+
+    def details(self):
+        # Open a card, which is when its overview, cast and trailer are fetched.
+        closed = [toggle for toggle in self.page.toggle
+                  if toggle.key and toggle.key.startswith('more_') and toggle.id not in self.widgets]
+        if closed:
+            self.rerun('card_details', self.rng.choice(closed).set_value(True))
+
+    def watchlist(self):
+        add = [button for button in self.page.button if button.key and button.key.startswith('add_')]
+        if add:
+            self.rerun('watchlist_add', self.rng.choice(add).click())
+        if not self.show_watchlist:
+            self.rerun('watchlist_toggle', self.button('watchlist_toggle').click())
+            self.show_watchlist = True
+        ratings = [slider for slider in self.page.slider if slider.key and slider.key.startswith('rate_')]
+        if ratings:
+            slider = self.rng.choice(ratings)
+            self.rerun('watchlist_rate', slider.set_value(self.rng.randint(1, 10)))
+            if len(ratings) > 3:
+                movie_id = slider.key[len('rate_'):]
+                self.rerun('watchlist_remove', self.button(f"remove_watchlist_{movie_id}").click())
+
+    def chatbot(self):
+        option = self.rng.choice(['genres', 'cast', 'year'])
+        if option == 'genres':
+            self.rerun('chatbot_open', self.button('chatbot_genres').click())
+            box = self.page.selectbox(key='chatbot_genre')
+            self.rerun('chatbot_genre', box.set_value(self.rng.choice(box.options[1:])))
+        elif option == 'cast':
+            self.rerun('chatbot_open', self.button('chatbot_cast_btn').click())
+            self.rerun('chatbot_cast', self.page.text_input(key='chatbot_cast').input(self.rng.choice(self.people)))
+        else:
+            self.rerun('chatbot_open', self.button('chatbot_year').click())
+            box = self.page.selectbox(key='chatbot_year_select')
+            self.rerun('chatbot_year', box.set_value(self.rng.choice(box.options[1:])))
+
+    FLOWS = ('theme', 'profile', 'recommend', 'recommend', 'random_pick', 'details', 'watchlist', 'watchlist',
+             'chatbot', 'chatbot')
+
+    def run(self, steps):
+        from websockets.sync.client import connect
+
+        with connect(self.url, max_size=None, open_timeout=RUN_TIMEOUT) as self.socket:
+            self.open()
+            for _ in range(steps):
+                getattr(self, self.rng.choice(self.FLOWS))()
+        return self.samples
+
+
+def run_level(server, sessions, steps, people, stub, seed=0):
+    """Run ``sessions`` concurrent sessions of ``steps`` flows each against ``server``; returns the level's report."""
+    requests_before = stub.requests
+    rss_before = server.rss()
+    rss_peak = [rss_before]
+    finished = threading.Event()
+    errors = []
+
+    def sample_rss():
+        while not finished.wait(0.1):
+            rss = server.rss()
+            if rss is not None:
+                rss_peak[0] = max(rss_peak[0], rss)
+
+    def simulate(index):
+        session = Session(server.url, seed * 1000 + index, people)
+        try:
+            return session.run(steps)
+        except Exception as e:
+            errors.append(f"session {index}: {e}")
+            logger.error(f"Session {index} failed: {e}")
+            return session.samples
+
+    sampler = threading.Thread(target=sample_rss, name='rss', daemon=True)
+    if rss_before is not None:
+        sampler.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix='session') as pool:
+        results = list(pool.map(simulate, range(sessions)))
+    wall = time.perf_counter() - start
+    finished.set()
+
+    samples = [sample for result in results for sample in result]
+    by_action = {}
+    for action, seconds in samples:
+        by_action.setdefault(action, []).append(seconds)
+    report = {
+        'sessions': sessions,
+        'reruns': len(samples),
+        'wall_s': round(wall, 3),
+        'reruns_per_s': round(len(samples) / wall, 2) if wall else None,
+        'tmdb_requests': stub.requests - requests_before,
+        'errors': errors,
+    }
+    if rss_before is not None:
+        sampler.join()
+        report.update({
+            'server_rss_mb': round(rss_before / 1e6, 2),
+            'server_rss_peak_mb': round(rss_peak[0] / 1e6, 2),
+            'rss_per_session_mb': round((rss_peak[0] - rss_before) / 1e6 / sessions, 2),
+        })
+    if samples:
+        seconds = [value for _, value in samples]
+        report['rerun'] = dict(summarize(seconds), p95_ms=round(float(np.percentile(seconds, 95)) * 1e3, 4))
+        report['actions'] = {action: summarize(values) for action, values in sorted(by_action.items())}
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the Streamlit app with concurrent simulated sessions.")
+    parser.add_argument('--sessions', type=int, nargs='+', default=DEFAULT_SESSIONS, help="concurrency levels to run")
+    parser.add_argument('--steps', type=int, default=15, help="flows per session after the first page load")
+    parser.add_argument('--movies', type=int, default=DEFAULT_MOVIES, help="synthetic catalog size")
+    parser.add_argument('--artifact', help="use this artifact root instead of a synthetic catalog")
+    parser.add_argument('--tmdb-latency', type=float, default=0.1, help="stub TMDB latency per request, seconds")
+    parser.add_argument('--tmdb-jitter', type=float, default=0.05)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', default='loadtest_output.json')
+    parser.add_argument('--keep-workdir', action='store_true',
+                        help="keep the temporary artifact, caches and Streamlit logs for inspection")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    workdir = tempfile.mkdtemp(prefix='movie-loadtest-')
+    try:
+        if args.artifact:
+            from recommender.artifact import read_catalog_frame, resolve
+
+            root = os.path.abspath(args.artifact)
+            frame = read_catalog_frame(resolve(root))
+            movie_ids = frame['movie_id'].astype(int).tolist()
+            people = sorted({name for cast in frame.get('cast', []) for name in (cast if cast is not None else [])})
+        else:
+            root = os.path.join(workdir, 'artifacts')
+            movies, people = build_artifact(args.movies, root, args.seed)
+            movie_ids = movies['movie_id'].tolist()
+        people = people or ['Tom Hanks']
+
+        stub = StubTMDB(movie_ids, args.tmdb_latency, args.tmdb_jitter, args.seed).start()
+        levels = []
+        try:
+            for sessions in args.sessions:
+                # A fresh server per level, so caches start cold and memory is measured per level.
+                server = AppServer(root, stub, tempfile.mkdtemp(prefix=f'level{sessions}-', dir=workdir)).start()
+                try:
+                    # One untimed page load, so the model load is not counted as per-session memory.
+                    Session(server.url, -1, people).run(0)
+                    logger.info("Running %d concurrent sessions x %d flows", sessions, args.steps)
+                    levels.append(run_level(server, sessions, args.steps, people, stub, args.seed))
+                finally:
+                    server.stop()
+                logger.info("%d sessions: p50 %.1f ms, p99 %.1f ms, %.1f reruns/s", sessions,
+                            levels[-1].get('rerun', {}).get('p50_ms', 0), levels[-1].get('rerun', {}).get('p99_ms', 0),
+                            levels[-1]['reruns_per_s'] or 0)
+        finally:
+            stub.stop()
+    finally:
+        if args.keep_workdir:
+            logger.info("Kept %s (artifact, caches and server logs)", workdir)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'movies': len(movie_ids),
+        'tmdb_latency_s': args.tmdb_latency,
+        'steps': args.steps,
+        'levels': levels,
+    }
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    logger.info("Wrote %s", args.out)
+    print(json.dumps([{key: level.get(key) for key in ('sessions', 'reruns_per_s', 'rerun', 'rss_per_session_mb', 'errors')}
+                      for level in levels], indent=2))
+
+
+if __name__ == '__main__':
+    main()
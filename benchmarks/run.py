@@ -0,0 +1,259 @@
+"""Benchmark the recommender core on synthetic catalogs.
+
+Usage::
+
+    python -m benchmarks.run --sizes 5000 50000 500000 --out bench.json
+    python -m benchmarks.run --sizes 5000 --baseline bench.json
+
+For every catalog size this measures artifact build time and size, cold
+load time, resident memory, and p50/p99 latency of the recommendation paths
+the app uses (Adult, Adult with the default year filter, Kids), of the
+sidebar filter path and of the typeahead title search. Serving is measured in a fresh process so load time
+and memory are not skewed by the build. With ``--baseline`` the run is
+compared against an earlier JSON file and exits non-zero if any p99 latency
+regressed by more than ``--tolerance``. ``--ann-lists`` adds an IVF index to
+each catalog and reports its recall@10 against the exact scan, unfiltered
+and under the Kids filter;
+``--embedding-dims`` (with ``--int8``) serves from SVD embeddings instead of
+TF-IDF vectors and reports their recall@10 against TF-IDF.
+"""
+import argparse
+import datetime
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from benchmarks.synthetic import GENRES, synthetic_movies
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [5000, 50000, 500000]
+DEFAULT_YEARS = (2000, 2024)
+# Above this size the O(N^2) offline neighbor build is skipped and every query scans.
+MAX_NEIGHBOR_SIZE = 50000
+
+
+def rss_bytes():
+    """Current resident set size; falls back to the peak where /proc is unavailable."""
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def summarize(samples):
+    samples = np.asarray(samples) * 1e3
+    return {
+        'p50_ms': round(float(np.percentile(samples, 50)), 4),
+        'p99_ms': round(float(np.percentile(samples, 99)), 4),
+        'mean_ms': round(float(samples.mean()), 4),
+        'n': int(samples.size),
+    }
+
+
+def timed(func, args_list, warmup=20):
+    for args in args_list[:warmup]:
+        func(*args)
+    samples = []
+    for args in args_list:
+        start = time.perf_counter()
+        func(*args)
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def measure_serving(root, queries, seed):
+    """Runs in a fresh process: load the artifact and time the serving paths."""
+    from recommender.engine import Recommender
+
+    rss_start = rss_bytes()
+    start = time.perf_counter()
+    engine = Recommender.load(root)
+    load_s = time.perf_counter() - start
+    rss_loaded = rss_bytes()
+
+    rng = np.random.default_rng(seed)
+    titles = engine.movies['title'].to_numpy()[rng.integers(0, len(engine), size=queries)]
+    default_years = engine.filter_mask('Adult', 'All', DEFAULT_YEARS)
+    kids = engine.filter_mask('Kids', 'All', DEFAULT_YEARS)
+
+    def sidebar(profile, genre, years):
+        mask = engine.filter_mask(profile, genre, years)
+        return engine.newest(6, year_range=years, mask=mask)
+
+    sidebar_args = []
+    for _ in range(queries):
+        low = int(rng.integers(1950, 2020))
+        sidebar_args.append((
+            'Kids' if rng.random() < 0.5 else 'Adult',
+            'All' if rng.random() < 0.3 else str(rng.choice(GENRES)),
+            (low, int(rng.integers(low, 2025))),
+        ))
+
+    ann = None
+    if engine.catalog.ann is not None:
+        from recommender.ann import recall_at_k
+
+        rows = rng.integers(0, len(engine), size=min(queries, 200))
+        recall, samples = recall_at_k(engine.catalog.ann, engine.catalog.similarity, rows)
+        kids_recall, kids_samples = recall_at_k(engine.catalog.ann, engine.catalog.similarity, rows, mask=kids)
+        ann = {'lists': engine.catalog.ann.lists, 'nprobe': engine.catalog.ann.nprobe,
+               'recall_at_10': round(recall, 4), 'search': summarize(samples),
+               'recall_at_10_kids': round(kids_recall, 4), 'search_kids': summarize(kids_samples)}
+
+    # What a user has typed so far: a prefix of a title, sometimes with one letter missing.
+    search_args = []
+    for title in titles:
+        title = title.lower()
+        typed = title[:int(rng.integers(1, min(len(title), 12) + 1))]
+        if len(typed) > 4 and rng.random() < 0.2:
+            drop = int(rng.integers(1, len(typed)))
+            typed = typed[:drop] + typed[drop + 1:]
+        search_args.append((typed,))
+
+    latency = {
+        'adult': timed(lambda title: engine.recommend(title), [(title,) for title in titles]),
+        'adult_default_years': timed(lambda title: engine.recommend(title, mask=default_years), [(title,) for title in titles]),
+        'kids': timed(lambda title: engine.recommend(title, mask=kids), [(title,) for title in titles]),
+        'sidebar_filter': timed(sidebar, sidebar_args),
+        'title_search': timed(lambda query: engine.search_titles(query, 10, mask=default_years), search_args),
+    }
+    return {
+        'load_s': round(load_s, 4),
+        'rss_loaded_mb': round((rss_loaded - rss_start) / 1e6, 2),
+        'rss_after_queries_mb': round((rss_bytes() - rss_start) / 1e6, 2),
+        'latency': latency,
+        'ann': ann,
+    }
+
+
+def embedding_recall(movies, similarity, queries, k=10, seed=0):
+    """Overlap of the embedding top ``k`` with the exact TF-IDF top ``k``."""
+    from recommender.similarity import build_similarity
+
+    exact = build_similarity(movies, None)
+    rows = np.random.default_rng(seed).integers(0, len(movies), size=min(queries, 200))
+    hits = sum(np.intersect1d(similarity.most_similar(row, k)[0], exact.most_similar(row, k)[0]).size for row in rows)
+    return hits / (k * rows.size)
+
+
+def bench_size(n, queries, workdir, max_neighbor_size=MAX_NEIGHBOR_SIZE, ann_lists=0,
+               embedding_dims=0, quantize=False, seed=0):
+    from recommender.artifact import write_artifact
+    from recommender.catalog import Catalog
+    from recommender.neighbors import DEFAULT_K
+
+    logger.info("Benchmarking %d movies", n)
+    movies = synthetic_movies(n, seed=seed)
+    neighbors_k = DEFAULT_K if n <= max_neighbor_size else 0
+    root = os.path.join(workdir, f'artifact-{n}')
+
+    start = time.perf_counter()
+    catalog = Catalog.from_frame(movies, None, neighbors_k=neighbors_k, ann_lists=ann_lists,
+                                 embedding_dims=embedding_dims, quantize=quantize)
+    build_s = time.perf_counter() - start
+    embedding = None
+    if embedding_dims:
+        embedding = {
+            'dims': catalog.similarity.embeddings.shape[1],
+            'quantized': catalog.similarity.quantized,
+            'bytes_per_movie': round(catalog.similarity.nbytes / n, 1),
+            'recall_at_10_vs_tfidf': round(embedding_recall(movies, catalog.similarity, queries, seed=seed), 4),
+        }
+    start = time.perf_counter()
+    write_artifact(root, catalog, source='synthetic')
+    write_s = time.perf_counter() - start
+    del catalog, movies
+
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        serving = pool.submit(measure_serving, root, queries, seed).result()
+    result = {
+        'size': n,
+        'neighbors_k': neighbors_k,
+        'build_s': round(build_s, 4),
+        'write_s': round(write_s, 4),
+        'artifact_mb': round(directory_bytes(root) / 1e6, 2),
+        'embedding': embedding,
+    }
+    result.update(serving)
+    shutil.rmtree(root, ignore_errors=True)
+    return result
+
+
+def compare(current, baseline, tolerance):
+    """Return a list of human-readable p99 regressions against ``baseline``."""
+    previous = {result['size']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in current['results']:
+        old = previous.get(result['size'])
+        if old is None:
+            continue
+        for path, stats in result['latency'].items():
+            before = old.get('latency', {}).get(path, {}).get('p99_ms')
+            if before and stats['p99_ms'] > before * (1 + tolerance):
+                regressions.append(f"{result['size']} {path}: p99 {before} ms -> {stats['p99_ms']} ms")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the recommender on synthetic catalogs.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--queries', type=int, default=500, help="timed queries per path")
+    parser.add_argument('--max-neighbor-size', type=int, default=MAX_NEIGHBOR_SIZE)
+    parser.add_argument('--ann-lists', type=int, default=0, help="also build an IVF index with this many lists")
+    parser.add_argument('--embedding-dims', type=int, default=0, help="serve from SVD embeddings of this size")
+    parser.add_argument('--int8', action='store_true', help="int8-quantize the embeddings")
+    parser.add_argument('--out', default='bench_output.json')
+    parser.add_argument('--baseline', help="earlier results to compare p99 latencies against")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="allowed p99 slowdown, as a fraction")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    workdir = tempfile.mkdtemp(prefix='movie-bench-')
+    try:
+        results = [bench_size(n, args.queries, workdir, args.max_neighbor_size, args.ann_lists,
+                              args.embedding_dims, args.int8) for n in args.sizes]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(args.out, 'w') as file:
+        json.dump(report, file, indent=2)
+    logger.info("Wrote %s", args.out)
+    print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(report, json.load(file), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Synthetic catalogs with the same schema as the notebook's ``movies`` frame.
+
+Tags mimic the real ones: a few genres, a handful of keywords drawn from a
+Zipf-like vocabulary (so popular keywords are shared by many movies), three
+cast members and a director, all lower-cased and space-joined. Every movie
+belongs to a latent topic that most of its keywords and people come from,
+the way franchises, sub-genres and studios cluster in the real catalog.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from recommender.genres import parse_genres
+
+GENRES = [
+    'Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+    'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction',
+    'TV Movie', 'Thriller', 'War', 'Western',
+]
+KEYWORDS_PER_MOVIE = 12
+CAST_PER_MOVIE = 3
+# Share of keywords and cast drawn from the movie's topic rather than globally.
+TOPIC_SHARE = 0.7
+
+
+def synthetic_movies(n, seed=0):
+    """Return a DataFrame of ``n`` movies: title, movie_id, genres, release_year, overview, tags, cast, crew, popularity."""
+    rng = np.random.default_rng(seed)
+    vocabulary = max(2000, n // 2)
+    people = max(1000, n // 3)
+    topics = max(20, int(np.sqrt(n)))
+    keyword_weights = 1.0 / np.arange(1, vocabulary + 1) ** 0.8
+    keyword_weights /= keyword_weights.sum()
+
+    genre_counts = rng.integers(1, 4, size=n)
+    topic = rng.integers(0, topics, size=n)
+    # A topic owns a contiguous slice of a shuffled keyword/people space.
+    keyword_slice, people_slice = max(1, vocabulary // topics), max(1, people // topics)
+    keyword_order, people_order = rng.permutation(vocabulary), rng.permutation(people)
+    keywords = rng.choice(vocabulary, size=(n, KEYWORDS_PER_MOVIE), p=keyword_weights)
+    local = rng.random((n, KEYWORDS_PER_MOVIE)) < TOPIC_SHARE
+    local_keywords = keyword_order[(topic[:, None] * keyword_slice
+                                    + rng.integers(0, keyword_slice, size=(n, KEYWORDS_PER_MOVIE))) % vocabulary]
+    keywords = np.where(local, local_keywords, keywords)
+    cast = rng.integers(0, people, size=(n, CAST_PER_MOVIE))
+    local = rng.random((n, CAST_PER_MOVIE)) < TOPIC_SHARE
+    local_cast = people_order[(topic[:, None] * people_slice
+                               + rng.integers(0, people_slice, size=(n, CAST_PER_MOVIE))) % people]
+    cast = np.where(local, local_cast, cast)
+    directors = rng.integers(0, people // 10, size=n)
+    years = rng.integers(1950, 2025, size=n)
+
+    titles, genres, tags, cast_names, crew_names = [], [], [], [], []
+    for i in range(n):
+        movie_genres = list(rng.choice(GENRES, size=genre_counts[i], replace=False))
+        movie_cast = [f"Actor{c} Surname{c}" for c in cast[i]]
+        movie_crew = [f"Director{directors[i]} Surname{directors[i]}"]
+        words = movie_genres + [f"kw{k}" for k in keywords[i]] + movie_cast + movie_crew
+        titles.append(f"Synthetic Movie {i}")
+        genres.append(' '.join(movie_genres))
+        tags.append(' '.join(words).lower())
+        cast_names.append(movie_cast)
+        crew_names.append(movie_crew)
+    # Heavy-tailed like TMDB's: a few blockbusters, a long tail of obscure movies.
+    popularity = np.round(rng.pareto(1.2, size=n) * 10, 3)
+
+    return pd.DataFrame({
+        'movie_id': np.arange(1, n + 1),
+        'title': titles,
+        'overview': '',
+        'genres': genres,
+        'release_year': years,
+        'tags': tags,
+        'cast': cast_names,
+        'crew': crew_names,
+        'popularity': popularity,
+    })
+
+
+def write_tmdb_csvs(n, directory, seed=0):
+    """Write ``n`` synthetic movies as TMDB-style movies/credits CSVs; returns both paths."""
+    movies = synthetic_movies(n, seed=seed)
+    os.makedirs(directory, exist_ok=True)
+    genre_ids = {genre: i for i, genre in enumerate(GENRES)}
+    raw = pd.DataFrame({
+        'id': movies['movie_id'],
+        'title': movies['title'],
+        'overview': movies['overview'],
+        'genres': [
+            json.dumps([{'id': genre_ids[genre], 'name': genre} for genre in parse_genres(genres)])
+            for genres in movies['genres']
+        ],
+        'keywords': [
+            json.dumps([{'id': int(word[2:]), 'name': word} for word in tags.split() if word.startswith('kw')])
+            for tags in movies['tags']
+        ],
+        'release_date': [f'{year}-06-01' for year in movies['release_year']],
+        'popularity': movies['popularity'],
+    })
+    credits = pd.DataFrame({
+        'movie_id': movies['movie_id'],
+        'title': movies['title'],
+        'cast': [json.dumps([{'name': name, 'order': i} for i, name in enumerate(cast)]) for cast in movies['cast']],
+        'crew': [json.dumps([{'name': name, 'job': 'Director'} for name in crew]) for crew in movies['crew']],
+    })
+    movies_csv = os.path.join(directory, 'movies.csv')
+    credits_csv = os.path.join(directory, 'credits.csv')
+    raw.to_csv(movies_csv, index=False)
+    credits.to_csv(credits_csv, index=False)
+    return movies_csv, credits_csv
@@ -1,7 +1,16 @@
 import gdown
 
+from recommender import artifact
+
 file_id = "1O1bpd5atxVG8OSpjL5o4m_Kdz3VEGHaE"
 url = f"https://drive.google.com/file/d/1O1bpd5atxVG8OSpjL5o4m_Kdz3VEGHaE/view?usp=sharing"
 output = "movie_data.pkl"
 
 gdown.download(url, output, quiet=False)
+
+# Convert the pickle into the memory-mapped artifact the app loads. Refitting
+# TF-IDF on the pickled tags reproduces the notebook's matrix and keeps the
+# vocabulary, which python -m recommender.update needs. Pickles written
+# before the notebook kept its cast/crew columns get their credits from TMDB,
+# so the Cast search has names to find.
+artifact.main([output, 'artifacts', '--refit-tfidf', '--tmdb-credits'])
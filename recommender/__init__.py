@@ -0,0 +1 @@
+"""Core recommendation logic shared by the Streamlit app and offline tools."""
@@ -0,0 +1,306 @@
+"""Async JSON recommendation API, served alongside the Streamlit UI.
+
+Usage::
+
+    python -m recommender.api --port 8000 --workers 4
+
+Endpoints (all ``GET``, all JSON)::
+
+    /recommend?title=&k=&profile=&genre=&year_from=&year_to=
+    /search?q=&limit=
+    /movie/{movie_id}
+    /health
+    /metrics        (Prometheus text; /metrics.json for JSON)
+
+The artifact is loaded once, before worker processes are forked, and shared
+read-only by every request; its arrays are memory-mapped, so workers share
+those pages too. Scoring runs on a thread pool so the event loop keeps
+accepting connections. The server speaks just enough HTTP/1.1 (GET, HEAD,
+keep-alive) for machine clients and load balancers. Request bodies are read
+and discarded, so a rejected POST cannot leave bytes behind that would be
+parsed as the next request on the connection.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from recommender.engine import DEFAULT_ARTIFACT_DIR, Recommender
+from recommender.metrics import PROMETHEUS_CONTENT_TYPE, REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RESULT_COLUMNS = ['movie_id', 'title', 'genres', 'release_year']
+MAX_K = 100
+MAX_HEADER_BYTES = 16 * 1024
+# Larger request bodies are not read; the connection is closed after the reply instead.
+MAX_BODY_BYTES = 64 * 1024
+ROUTES = {'/recommend', '/search', '/health', '/metrics', '/metrics.json'}
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def plain(value):
+    """JSON-ready Python value for one catalog cell."""
+    if isinstance(value, np.ndarray):
+        return [plain(item) for item in value.tolist()]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+def _param(params, name, default=None, cast=str):
+    values = params.get(name)
+    if not values or values[0] == '':
+        return default
+    try:
+        return cast(values[0])
+    except ValueError:
+        raise HTTPError(400, f"Invalid value for {name!r}: {values[0]!r}")
+
+
+class RecommendationAPI:
+    """Request routing and handlers; one instance per worker process."""
+
+    def __init__(self, engine, threads=None):
+        self.engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='api')
+        # Plain Python copies of the response columns, so building a response
+        # is list indexing rather than a pandas round-trip.
+        self.columns = {
+            column: [plain(value) for value in engine.movies[column].tolist()]
+            for column in RESULT_COLUMNS if column in engine.movies.columns
+        }
+
+    def records(self, rows, scores=None, extra=None):
+        results = []
+        for i, row in enumerate(rows):
+            record = {column: values[row] for column, values in self.columns.items()}
+            if scores is not None:
+                record['score'] = round(float(scores[i]), 6)
+            for column in extra or ():
+                record[column] = plain(self.engine.movies[column].iat[row])
+            results.append(record)
+        return results
+
+    async def run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    async def dispatch(self, path, params):
+        if path == '/recommend':
+            return await self.run(self.recommend, params)
+        if path == '/search':
+            return await self.run(self.search, params)
+        if path.startswith('/movie/'):
+            return await self.run(self.movie, path[len('/movie/'):])
+        if path == '/health':
+            return {'status': 'ok', 'movies': len(self.engine), 'version': self.engine.catalog.version}
+        if path == '/metrics':
+            return REGISTRY.prometheus()
+        if path == '/metrics.json':
+            return REGISTRY.snapshot()
+        raise HTTPError(404, f"No route for {path}")
+
+    def recommend(self, params):
+        title = _param(params, 'title')
+        if not title:
+            raise HTTPError(400, "Missing 'title'")
+        k = min(max(_param(params, 'k', 10, int), 1), MAX_K)
+        year_from = _param(params, 'year_from', None, int)
+        year_to = _param(params, 'year_to', None, int)
+        year_range = None
+        if year_from is not None or year_to is not None:
+            year_range = (year_from if year_from is not None else -10**9, year_to if year_to is not None else 10**9)
+        try:
+            rows, scores = self.engine.recommend_rows(
+                title, k=k,
+                profile=_param(params, 'profile', 'Adult'),
+                genre=_param(params, 'genre', 'All'),
+                year_range=year_range,
+            )
+        except KeyError:
+            raise HTTPError(404, f"Unknown title: {title!r}")
+        return {'title': title, 'results': self.records(rows, scores)}
+
+    def search(self, params):
+        query = _param(params, 'q', '')
+        limit = min(max(_param(params, 'limit', 10, int), 1), MAX_K)
+        frame = self.engine.search_titles(query, limit)
+        return {'query': query, 'results': self.records(self.engine.movies.index.get_indexer(frame.index))}
+
+    def movie(self, movie_id):
+        try:
+            row = self.engine.movie_row(int(movie_id))
+        except ValueError:
+            raise HTTPError(400, f"Invalid movie id: {movie_id!r}")
+        if row is None:
+            raise HTTPError(404, f"Unknown movie id: {movie_id}")
+        extra = ['overview'] if 'overview' in self.engine.movies.columns else []
+        return self.records([row], extra=extra)[0]
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except asyncio.LimitOverrunError:
+                    await self.respond(writer, 400, {'error': 'Request header too large'}, keep_alive=False)
+                    break
+                lines = head.decode('latin-1').split('\r\n')
+                try:
+                    method, target, version = lines[0].split(' ', 2)
+                except ValueError:
+                    await self.respond(writer, 400, {'error': 'Malformed request line'}, keep_alive=False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                # No endpoint takes a body; drain it so the next request starts where it should.
+                try:
+                    length = int(headers.get('content-length', 0))
+                except ValueError:
+                    length = -1
+                if 'transfer-encoding' in headers or not 0 <= length <= MAX_BODY_BYTES:
+                    keep_alive = False
+                elif length:
+                    try:
+                        await reader.readexactly(length)
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        break
+                # HEAD is answered like GET, without the body.
+                status, body = await self.route('GET' if method == 'HEAD' else method, target)
+                await self.respond(writer, status, body, keep_alive, head_only=method == 'HEAD')
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def route(self, method, target):
+        if method != 'GET':
+            return 405, {'error': f"Method {method} not allowed"}
+        url = urlsplit(target)
+        route = '/movie/{id}' if url.path.startswith('/movie/') else url.path if url.path in ROUTES else 'other'
+        status = 500
+        start = time.perf_counter()
+        try:
+            body = await self.dispatch(url.path, parse_qs(url.query))
+            status = 200
+            return status, body
+        except HTTPError as e:
+            status = e.status
+            return status, {'error': e.message}
+        except Exception:
+            logger.exception(f"Unhandled error for {target}")
+            return status, {'error': 'Internal server error'}
+        finally:
+            REGISTRY.inc('api_requests_total', route=route, status=status)
+            REGISTRY.observe('api_request_seconds', time.perf_counter() - start, route=route)
+
+    async def respond(self, writer, status, body, keep_alive=True, head_only=False):
+        if isinstance(body, str):
+            payload, content_type = body.encode('utf-8'), PROMETHEUS_CONTENT_TYPE
+        else:
+            payload, content_type = json.dumps(body, separators=(',', ':')).encode('utf-8'), 'application/json'
+        head = (
+            f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n"
+        )
+        writer.write(head.encode('latin-1') + (b'' if head_only else payload))
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+
+async def serve(api, sock):
+    server = await asyncio.start_server(api.handle, sock=sock, limit=MAX_HEADER_BYTES)
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    async with server:
+        await stop.wait()
+
+
+def bind(host, port, backlog=1024):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.setblocking(False)
+    return sock
+
+
+def run_worker(engine, sock, threads):
+    asyncio.run(serve(RecommendationAPI(engine, threads), sock))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve recommendations as a JSON API.")
+    parser.add_argument('--artifact', default=DEFAULT_ARTIFACT_DIR)
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=int(os.environ.get('PORT', 8000)))
+    parser.add_argument('--workers', type=int, default=1, help="processes sharing the listening socket")
+    parser.add_argument('--threads', type=int, default=None, help="scoring threads per worker")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    engine = Recommender.load(args.artifact)
+    sock = bind(args.host, args.port)
+    logger.info("Serving %d movies on %s:%d with %d worker(s)", len(engine), args.host, args.port, args.workers)
+    if args.workers <= 1 or not hasattr(os, 'fork'):
+        run_worker(engine, sock, args.threads)
+        return
+
+    children = []
+    for _ in range(args.workers):
+        pid = os.fork()
+        if pid == 0:
+            # The engine was loaded before forking, so workers share its pages.
+            try:
+                run_worker(engine, sock, args.threads)
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def forward(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    for child in children:
+        os.waitpid(child, 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,232 @@
+"""Versioned, memory-mappable on-disk artifact for the catalog.
+
+An artifact root holds one directory per version plus a ``CURRENT`` file
+naming the live one::
+
+    artifacts/
+        CURRENT
+        v20250526T101500/
+            manifest.json
+            catalog.parquet
+            vectors_data.npy  vectors_indices.npy  vectors_indptr.npy
+                (or embeddings.npy [+ embedding_scales.npy] for an embedding catalog)
+            tfidf_terms.npy  tfidf_idf.npy        (frozen vocabulary, for updates)
+            neighbors_ids.npy  neighbors_scores.npy
+            genre_bits.npy
+            people_names.npy  people_indptr.npy  people_rows.npy
+            title_keys.npy  title_key_rows.npy  title_tiers.npy  title_rank.npy
+            title_grams.npy  title_gram_indptr.npy  title_gram_rows.npy
+            title_heavy_prefixes.npy  title_heavy_indptr.npy  title_heavy_rows.npy
+            ann_centroids_*.npy  ann_offsets.npy  ann_rows.npy   (optional IVF index)
+
+Arrays are plain ``.npy`` files opened with ``mmap_mode='r'``, so loading is
+cheap and several processes on one host share the same pages through the OS
+page cache. Convert an existing pickle with::
+
+    python -m recommender.artifact movie_data.pkl artifacts
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import pickle
+import shutil
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from recommender.people import read_credits, tmdb_credits
+from recommender.similarity import DenseSimilarity, SparseSimilarity
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST = 'manifest.json'
+CURRENT = 'CURRENT'
+CATALOG = 'catalog.parquet'
+
+
+def new_version():
+    return datetime.datetime.now(datetime.timezone.utc).strftime('v%Y%m%dT%H%M%S%f')
+
+
+def resolve(path):
+    """Return the version directory for ``path``, following ``CURRENT`` if present."""
+    current = os.path.join(path, CURRENT)
+    if os.path.exists(current):
+        with open(current) as file:
+            return os.path.join(path, file.read().strip())
+    return path
+
+
+def read_manifest(path):
+    with open(os.path.join(path, MANIFEST)) as file:
+        manifest = json.load(file)
+    if manifest.get('format_version') != FORMAT_VERSION:
+        raise ValueError(f"Unsupported artifact format {manifest.get('format_version')!r} in {path}")
+    return manifest
+
+
+def save_array(directory, name, array):
+    np.save(os.path.join(directory, f'{name}.npy'), np.ascontiguousarray(array))
+    return f'{name}.npy'
+
+
+def load_array(directory, name, mmap=True):
+    return np.load(os.path.join(directory, f'{name}.npy'), mmap_mode='r' if mmap else None)
+
+
+def save_names(directory, name, names):
+    """Store a list of strings as one newline-joined UTF-8 byte array."""
+    blob = '\n'.join(names).encode('utf-8')
+    return save_array(directory, name, np.frombuffer(blob, dtype=np.uint8))
+
+
+def load_names(directory, name):
+    blob = load_array(directory, name, mmap=False)
+    return blob.tobytes().decode('utf-8').split('\n') if blob.size else []
+
+
+def save_csr(directory, name, matrix):
+    matrix = sparse.csr_matrix(matrix)
+    return [
+        save_array(directory, f'{name}_data', matrix.data),
+        save_array(directory, f'{name}_indices', matrix.indices),
+        save_array(directory, f'{name}_indptr', matrix.indptr),
+    ]
+
+
+def load_csr(directory, name, shape, mmap=True):
+    arrays = [load_array(directory, f'{name}_{part}', mmap) for part in ('data', 'indices', 'indptr')]
+    return sparse.csr_matrix(tuple(arrays), shape=tuple(shape), copy=False)
+
+
+def write_artifact(root, catalog, source=None):
+    """Write ``catalog`` as a new version under ``root`` and make it current.
+
+    The version is assembled in a temporary directory and renamed into place,
+    and ``CURRENT`` is swapped with ``os.replace``, so readers never observe a
+    half-written artifact.
+    """
+    similarity = catalog.similarity
+    if not isinstance(similarity, (SparseSimilarity, DenseSimilarity)):
+        raise ValueError("Artifacts need TF-IDF vectors; rebuild the dataset with a tags column")
+    os.makedirs(root, exist_ok=True)
+    version = new_version()
+    staging = os.path.join(root, f'.{version}.tmp')
+    os.makedirs(staging)
+    try:
+        files = [CATALOG]
+        catalog.movies.to_parquet(os.path.join(staging, CATALOG), index=False)
+        if isinstance(similarity, DenseSimilarity):
+            files.append(save_array(staging, 'embeddings', similarity.embeddings))
+            if similarity.quantized:
+                files.append(save_array(staging, 'embedding_scales', similarity.scales))
+        else:
+            files += save_csr(staging, 'vectors', similarity.vectors)
+            if similarity.model is not None:
+                files.append(save_names(staging, 'tfidf_terms', similarity.model.terms))
+                files.append(save_array(staging, 'tfidf_idf', similarity.model.idf))
+        files.append(save_array(staging, 'neighbors_ids', catalog.neighbors.ids))
+        files.append(save_array(staging, 'neighbors_scores', catalog.neighbors.scores))
+        files.append(save_array(staging, 'genre_bits', catalog.genres.bits))
+        files.append(save_names(staging, 'people_names', catalog.people.names))
+        files.append(save_array(staging, 'people_indptr', catalog.people.indptr))
+        files.append(save_array(staging, 'people_rows', catalog.people.rows))
+        search = catalog.title_search
+        files.append(save_names(staging, 'title_keys', search.keys))
+        files.append(save_array(staging, 'title_key_rows', search.key_rows))
+        files.append(save_array(staging, 'title_tiers', search.tiers))
+        files.append(save_array(staging, 'title_rank', search.rank))
+        files.append(save_names(staging, 'title_grams', search.grams))
+        files.append(save_array(staging, 'title_gram_indptr', search.gram_indptr))
+        files.append(save_array(staging, 'title_gram_rows', search.gram_rows))
+        heavy_prefixes, heavy_indptr, heavy_rows = search.heavy_csr()
+        files.append(save_names(staging, 'title_heavy_prefixes', heavy_prefixes))
+        files.append(save_array(staging, 'title_heavy_indptr', heavy_indptr))
+        files.append(save_array(staging, 'title_heavy_rows', heavy_rows))
+        ann = getattr(catalog, 'ann', None)
+        if ann is not None:
+            files += save_csr(staging, 'ann_centroids', ann.centroids)
+            files.append(save_array(staging, 'ann_offsets', ann.offsets))
+            files.append(save_array(staging, 'ann_rows', ann.rows))
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'version': version,
+            'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'source': source,
+            'num_movies': len(catalog.movies),
+            'neighbors_k': catalog.neighbors.k,
+            'genres': catalog.genres.vocabulary,
+            'people': len(catalog.people),
+            'title_search': {'keys': len(search.keys), 'grams': len(search.grams), 'heavy': len(heavy_prefixes)},
+            'files': files,
+        }
+        if isinstance(similarity, DenseSimilarity):
+            manifest['embedding'] = {'dims': similarity.embeddings.shape[1], 'quantized': similarity.quantized}
+        else:
+            manifest['vectors_shape'] = list(similarity.vectors.shape)
+            manifest['tfidf'] = similarity.model is not None
+        if ann is not None:
+            manifest['ann'] = {'lists': ann.lists, 'nprobe': ann.nprobe, 'centroids_shape': list(ann.centroids.shape)}
+        with open(os.path.join(staging, MANIFEST), 'w') as file:
+            json.dump(manifest, file, indent=2)
+        os.rename(staging, os.path.join(root, version))
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    set_current(root, version)
+    logger.info("Wrote artifact %s (%d movies)", os.path.join(root, version), len(catalog.movies))
+    return os.path.join(root, version)
+
+
+def set_current(root, version):
+    tmp = os.path.join(root, f'.{CURRENT}.tmp')
+    with open(tmp, 'w') as file:
+        file.write(version + '\n')
+    os.replace(tmp, os.path.join(root, CURRENT))
+
+
+def read_catalog_frame(path):
+    return pd.read_parquet(os.path.join(path, CATALOG))
+
+
+def main(argv=None):
+    from recommender.catalog import Catalog
+
+    parser = argparse.ArgumentParser(description="Convert movie_data.pkl into a versioned artifact.")
+    parser.add_argument('dataset', nargs='?', default='movie_data.pkl')
+    parser.add_argument('root', nargs='?', default='artifacts')
+    parser.add_argument('--credits', help="tmdb_5000_credits.csv, for the cast/crew search index")
+    parser.add_argument('--tmdb-credits', action='store_true',
+                        help="fetch cast and directors from TMDB when the dataset has no cast/crew columns")
+    parser.add_argument('--ann-lists', type=int, default=0, help="build an IVF index with this many lists")
+    parser.add_argument('--embedding-dims', type=int, default=0, help="store SVD embeddings instead of TF-IDF vectors")
+    parser.add_argument('--int8', action='store_true', help="int8-quantize the embeddings")
+    parser.add_argument('--refit-tfidf', action='store_true',
+                        help="refit TF-IDF from the tags column so the artifact keeps its vocabulary")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.dataset, 'rb') as file:
+        movies, matrix = pickle.load(file)
+    credits = read_credits(args.credits) if args.credits else None
+    if credits is None and args.tmdb_credits and not {'cast', 'crew'} & set(movies.columns):
+        from recommender.tmdb import TMDBClient
+
+        logger.info("Fetching credits for %d movies from TMDB", len(movies))
+        credits = tmdb_credits(TMDBClient(), movies['movie_id'])
+    if args.refit_tfidf:
+        matrix = None
+    catalog = Catalog.from_frame(movies, matrix, credits=credits, ann_lists=args.ann_lists,
+                                 embedding_dims=args.embedding_dims, quantize=args.int8)
+    if not len(catalog.people):
+        logger.warning("No cast or crew in %s; the Cast search will find nothing. "
+                       "Pass --credits or --tmdb-credits.", args.dataset)
+    write_artifact(args.root, catalog, source=os.path.basename(args.dataset))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,134 @@
+"""Scripted catalog build from the raw TMDB CSVs, replacing the Kaggle notebook.
+
+Usage::
+
+    python -m recommender.build tmdb_5000_movies.csv tmdb_5000_credits.csv artifacts --workers 4
+
+Both CSVs are streamed in chunks, and the JSON-ish columns (genres,
+keywords, cast, crew) are parsed on a process pool with a bounded number of
+chunks in flight, so memory holds only the compact parsed columns rather
+than the raw JSON. Movies and credits are joined on the movie id (the
+notebook joined on title, which duplicated rows for repeated titles); tags
+are built exactly as the notebook builds them, and the result is written
+straight to a new artifact version.
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from recommender.artifact import write_artifact
+from recommender.catalog import Catalog
+from recommender.neighbors import DEFAULT_K
+from recommender.people import TOP_CAST
+
+try:
+    import orjson
+except ImportError:  # optional; the standard library parser gives the same result, slower
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS = 2000
+MOVIE_COLUMNS = ['id', 'title', 'overview', 'genres', 'keywords', 'release_date', 'popularity']
+CREDIT_COLUMNS = ['movie_id', 'cast', 'crew']
+
+
+def loads(text):
+    """Parse one JSON cell; empty or missing cells are an empty list."""
+    if not isinstance(text, str) or not text:
+        return []
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+def names(text):
+    return [item['name'] for item in loads(text)]
+
+
+def parse_movies(chunk):
+    """Compact columns for one chunk of ``tmdb_5000_movies.csv``."""
+    years = pd.to_datetime(chunk['release_date'], errors='coerce').dt.year
+    return pd.DataFrame({
+        'movie_id': chunk['id'].astype('int64').to_numpy(),
+        'title': chunk['title'].to_numpy(),
+        'overview': chunk['overview'].fillna('').to_numpy(),
+        'genres': [names(value) for value in chunk['genres']],
+        'keywords': [names(value) for value in chunk['keywords']],
+        'release_year': years.astype('Int64').to_numpy(),
+        'popularity': pd.to_numeric(chunk['popularity'], errors='coerce').to_numpy(dtype=float),
+    })
+
+
+def parse_credits(chunk):
+    """Top-billed cast and directors for one chunk of ``tmdb_5000_credits.csv``."""
+    cast, crew = [], []
+    for cast_json, crew_json in zip(chunk['cast'], chunk['crew']):
+        members = sorted(loads(cast_json), key=lambda member: member.get('order', 0))
+        cast.append([member['name'] for member in members[:TOP_CAST]])
+        crew.append([member['name'] for member in loads(crew_json) if member.get('job') == 'Director'])
+    return pd.DataFrame({'movie_id': chunk['movie_id'].astype('int64').to_numpy(), 'cast': cast, 'crew': crew})
+
+
+def parallel_map(pool, func, chunks, window):
+    """``pool.map`` that keeps at most ``window`` chunks in flight, in order."""
+    pending = collections.deque()
+    for chunk in chunks:
+        pending.append(pool.submit(func, chunk))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def stream(pool, path, columns, func, chunk_rows, window):
+    chunks = pd.read_csv(path, usecols=columns, chunksize=chunk_rows)
+    parts = list(parallel_map(pool, func, chunks, window))
+    return pd.concat(parts, ignore_index=True) if parts else func(pd.DataFrame(columns=columns))
+
+
+def build_frame(movies_csv, credits_csv, workers=None, chunk_rows=CHUNK_ROWS):
+    """The notebook's ``movies`` frame (plus genres, release year, cast, crew), joined on movie id."""
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        movies = stream(pool, movies_csv, MOVIE_COLUMNS, parse_movies, chunk_rows, 2 * workers)
+        credits = stream(pool, credits_csv, CREDIT_COLUMNS, parse_credits, chunk_rows, 2 * workers)
+    movies = movies.drop_duplicates('movie_id').merge(
+        credits.drop_duplicates('movie_id'), on='movie_id', how='inner', validate='one_to_one')
+    movies['tags'] = [
+        ' '.join(genres + keywords + cast + crew).lower()
+        for genres, keywords, cast, crew in zip(movies['genres'], movies['keywords'], movies['cast'], movies['crew'])
+    ]
+    movies['genres'] = [', '.join(genres) for genres in movies['genres']]
+    return movies.drop(columns=['keywords'])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a catalog artifact from the TMDB movies and credits CSVs.")
+    parser.add_argument('movies_csv')
+    parser.add_argument('credits_csv')
+    parser.add_argument('root', nargs='?', default='artifacts')
+    parser.add_argument('--workers', type=int, default=None, help="parser processes (default: CPU count)")
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+    parser.add_argument('--neighbors-k', type=int, default=DEFAULT_K, help="0 skips the neighbor index")
+    parser.add_argument('--ann-lists', type=int, default=0, help="build an IVF index with this many lists")
+    parser.add_argument('--embedding-dims', type=int, default=0, help="store SVD embeddings instead of TF-IDF vectors")
+    parser.add_argument('--int8', action='store_true', help="int8-quantize the embeddings")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    movies = build_frame(args.movies_csv, args.credits_csv, args.workers, args.chunk_rows)
+    logger.info("Parsed and joined %d movies in %.1fs", len(movies), time.perf_counter() - start)
+    catalog = Catalog.from_frame(movies, None, neighbors_k=args.neighbors_k, ann_lists=args.ann_lists,
+                                 embedding_dims=args.embedding_dims, quantize=args.int8)
+    write_artifact(args.root, catalog, source=os.path.basename(args.movies_csv))
+    logger.info("Build finished in %.1fs", time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+"""Disk-backed, cross-process cache for TMDB responses.
+
+Entries live in one SQLite database in WAL mode, so every worker process on
+a host reads and writes the same cache, and it survives restarts. Each entry
+carries its own expiry (TTLs are chosen per endpoint by the caller), and the
+least recently used entries are evicted once the database grows past its
+size cap. After it expires, an entry can still be returned as stale for a
+grace period, so callers can serve it while a refresh runs in the background.
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = os.environ.get('TMDB_CACHE_PATH', os.path.join('.cache', 'tmdb.sqlite3'))
+DEFAULT_MAX_BYTES = int(os.environ.get('TMDB_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+# Reads only bump an entry's LRU timestamp when it is older than this.
+TOUCH_INTERVAL = 60
+# Size is checked against the cap every this many writes.
+EVICT_EVERY = 64
+
+
+def needs_touch(accessed_at, now):
+    """Whether a read at ``now`` should bump an LRU timestamp last set at ``accessed_at``."""
+    return now - accessed_at > TOUCH_INTERVAL
+
+
+class WriteCounter:
+    """Counts writes to a size-capped store; ``add`` is true on every ``EVICT_EVERY``-th one."""
+
+    def __init__(self, every=EVICT_EVERY):
+        self.every = every
+        self.writes = 0
+        self.lock = threading.Lock()
+
+    def add(self):
+        with self.lock:
+            self.writes += 1
+            return self.writes % self.every == 0
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires_at REAL NOT NULL,
+    stale_until REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+"""
+
+
+class DiskCache:
+    """JSON values in SQLite with per-entry expiry and LRU eviction under a size cap."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._writes = WriteCounter()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connect() as db:
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections can't be shared between threads; keep one per thread.
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            self._local.db = db
+        return db
+
+    def get(self, key):
+        """Return ``(value, fresh)``; ``(None, False)`` when the key is absent or too stale."""
+        now = time.time()
+        try:
+            db = self._connect()
+            row = db.execute(
+                'SELECT value, expires_at, stale_until, accessed_at FROM entries WHERE key = ?', (key,),
+            ).fetchone()
+            if row is None:
+                return None, False
+            value, expires_at, stale_until, accessed_at = row
+            if now >= stale_until:
+                db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                return None, False
+            if needs_touch(accessed_at, now):
+                db.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+            return json.loads(value), now < expires_at
+        except sqlite3.Error as e:
+            logger.error(f"Cache read failed for {key}: {str(e)}")
+            return None, False
+
+    def set(self, key, value, ttl, stale=0):
+        """Store ``value``: fresh for ``ttl`` seconds, then stale for ``stale`` more."""
+        now = time.time()
+        blob = json.dumps(value, separators=(',', ':')).encode('utf-8')
+        try:
+            self._connect().execute(
+                'INSERT OR REPLACE INTO entries (key, value, size, expires_at, stale_until, accessed_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, blob, len(blob), now + ttl, now + ttl + stale, now),
+            )
+        except sqlite3.Error as e:
+            logger.error(f"Cache write failed for {key}: {str(e)}")
+            return
+        if self._writes.add():
+            self.evict()
+
+    def delete(self, key):
+        self._connect().execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def size(self):
+        return self._connect().execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def evict(self):
+        """Drop least recently used entries until the cache is under 90% of its cap."""
+        db = self._connect()
+        try:
+            total = self.size()
+            if total <= self.max_bytes:
+                return 0
+            target = total - int(self.max_bytes * 0.9)
+            victims = []
+            freed = 0
+            for key, size in db.execute('SELECT key, size FROM entries ORDER BY accessed_at'):
+                if freed >= target:
+                    break
+                victims.append((key,))
+                freed += size
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany('DELETE FROM entries WHERE key = ?', victims)
+            db.execute('COMMIT')
+            removed = len(victims)
+            logger.info("Evicted %d cache entries (%d bytes)", removed, freed)
+            return removed
+        except sqlite3.Error as e:
+            logger.error(f"Cache eviction failed: {str(e)}")
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            return 0
@@ -0,0 +1,187 @@
+"""The loaded catalog: movie metadata plus every index built over it."""
+import logging
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from recommender import artifact
+from recommender.ann import IVFIndex
+from recommender.embeddings import embedding_similarity
+from recommender.genres import GenreIndex
+from recommender.neighbors import DEFAULT_K, NeighborIndex, TitleIndex
+from recommender.people import PeopleIndex, people_from_frame
+from recommender.search import TitleSearch
+from recommender.similarity import DenseSimilarity, SparseSimilarity, TfidfModel, build_similarity
+from recommender.years import YearIndex
+
+logger = logging.getLogger(__name__)
+
+KIDS_GENRE = 'Animation'
+
+
+def release_years(movies):
+    """``release_year`` as floats, NaN where it is unknown (or the column is missing)."""
+    if 'release_year' not in movies.columns:
+        return np.full(len(movies), np.nan)
+    return movies['release_year'].to_numpy(dtype=float, na_value=np.nan)
+
+
+def popularity(movies):
+    """TMDB ``popularity`` as floats, or None when the catalog has no such column."""
+    if 'popularity' not in movies.columns:
+        return None
+    return pd.to_numeric(movies['popularity'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+
+class Catalog:
+    """Movie rows and the read-only indexes used to serve them.
+
+    Row positions are shared by everything here: row ``i`` of ``movies`` is
+    row ``i`` of the similarity vectors and of the neighbor index. ``ann`` is
+    an optional ``IVFIndex`` that replaces the exact scan for large catalogs.
+    """
+
+    def __init__(self, movies, similarity, neighbors, version=None, genres=None, people=None, ann=None,
+                 title_search=None):
+        self.movies = movies
+        self.similarity = similarity
+        self.neighbors = neighbors
+        self.titles = TitleIndex.from_movies(movies)
+        self.genres = genres if genres is not None else GenreIndex.from_values(movies['genres'])
+        self.people = people if people is not None else PeopleIndex.from_people(people_from_frame(movies))
+        self.years = YearIndex.from_years(release_years(movies))
+        self.title_search = title_search if title_search is not None else TitleSearch.from_titles(
+            movies['title'], popularity(movies))
+        self.ann = ann
+        self.version = version
+
+    def __len__(self):
+        return len(self.movies)
+
+    @classmethod
+    def from_frame(cls, movies, matrix, neighbors=None, credits=None, neighbors_k=DEFAULT_K, ann_lists=0,
+                   embedding_dims=0, quantize=False):
+        """Build from the ``(movies, matrix)`` pair stored in ``movie_data.pkl``.
+
+        ``credits`` is the ``movie_id -> names`` mapping from
+        ``people.read_credits``; without it, cast and crew come from the
+        frame's own ``cast``/``crew`` columns when it has them. With
+        ``neighbors_k=0`` no neighbor index is built and every query scans.
+        ``ann_lists`` > 0 builds an IVF index with that many lists.
+        ``embedding_dims`` > 0 replaces the TF-IDF vectors with that many
+        SVD dimensions (int8-quantized with ``quantize``).
+        """
+        movies = movies.reset_index(drop=True)
+        similarity = build_similarity(movies, matrix)
+        if embedding_dims and isinstance(similarity, SparseSimilarity):
+            if ann_lists:
+                logger.warning("The IVF index needs TF-IDF vectors; skipping it for an embedding catalog")
+                ann_lists = 0
+            similarity = embedding_similarity(similarity.vectors, embedding_dims, quantize)
+        if neighbors is None:
+            neighbors = NeighborIndex.build(similarity, k=neighbors_k)
+        people = PeopleIndex.from_credits(movies['movie_id'], credits) if credits is not None else None
+        ann = None
+        if ann_lists and isinstance(similarity, SparseSimilarity):
+            ann = IVFIndex.build(similarity.vectors, lists=ann_lists)
+        return cls(movies, similarity, neighbors, people=people, ann=ann)
+
+    @classmethod
+    def from_pickle(cls, path='movie_data.pkl', neighbors_path='movie_neighbors.npz'):
+        with open(path, 'rb') as file:
+            movies, matrix = pickle.load(file)
+        neighbors = NeighborIndex.load(neighbors_path) if os.path.exists(neighbors_path) else None
+        return cls.from_frame(movies, matrix, neighbors)
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """Open an artifact directory (or artifact root) written by ``artifact.write_artifact``."""
+        path = artifact.resolve(path)
+        manifest = artifact.read_manifest(path)
+        movies = artifact.read_catalog_frame(path)
+        if 'embedding' in manifest:
+            scales = artifact.load_array(path, 'embedding_scales', mmap) if manifest['embedding']['quantized'] else None
+            similarity = DenseSimilarity(artifact.load_array(path, 'embeddings', mmap), scales)
+        else:
+            vectors = artifact.load_csr(path, 'vectors', manifest['vectors_shape'], mmap)
+            model = None
+            if manifest.get('tfidf'):
+                model = TfidfModel(artifact.load_names(path, 'tfidf_terms'), artifact.load_array(path, 'tfidf_idf', mmap))
+            similarity = SparseSimilarity(vectors, normalized=True, model=model)
+        neighbors = NeighborIndex(
+            artifact.load_array(path, 'neighbors_ids', mmap),
+            artifact.load_array(path, 'neighbors_scores', mmap),
+        )
+        genres = None
+        if 'genres' in manifest:
+            genres = GenreIndex(manifest['genres'], artifact.load_array(path, 'genre_bits', mmap))
+        people = None
+        if 'people' in manifest:
+            people = PeopleIndex(
+                artifact.load_names(path, 'people_names'),
+                artifact.load_array(path, 'people_indptr', mmap),
+                artifact.load_array(path, 'people_rows', mmap),
+            )
+        title_search = None
+        if 'title_search' in manifest:
+            heavy = None
+            # Artifacts written before the rankings were stored get them ranked here.
+            if 'heavy' in manifest['title_search']:
+                heavy = TitleSearch.heavy_from_csr(
+                    artifact.load_names(path, 'title_heavy_prefixes'),
+                    artifact.load_array(path, 'title_heavy_indptr', mmap),
+                    artifact.load_array(path, 'title_heavy_rows', mmap),
+                )
+            title_search = TitleSearch(
+                artifact.load_names(path, 'title_keys'),
+                artifact.load_array(path, 'title_key_rows', mmap),
+                artifact.load_array(path, 'title_tiers', mmap),
+                artifact.load_names(path, 'title_grams'),
+                artifact.load_array(path, 'title_gram_indptr', mmap),
+                artifact.load_array(path, 'title_gram_rows', mmap),
+                artifact.load_array(path, 'title_rank', mmap),
+                heavy,
+            )
+        ann = None
+        if 'ann' in manifest:
+            ann = IVFIndex(
+                similarity.vectors,
+                artifact.load_csr(path, 'ann_centroids', manifest['ann']['centroids_shape'], mmap),
+                artifact.load_array(path, 'ann_offsets', mmap),
+                artifact.load_array(path, 'ann_rows', mmap),
+                nprobe=manifest['ann']['nprobe'],
+            )
+        logger.info("Opened artifact %s (%d movies)", manifest['version'], manifest['num_movies'])
+        return cls(movies, similarity, neighbors,
+                   version=manifest['version'], genres=genres, people=people, ann=ann, title_search=title_search)
+
+    def eligibility_mask(self, profile='Adult', genre='All', year_range=None):
+        """Boolean array of rows allowed by the profile, genre and year filters."""
+        mask = np.ones(len(self), dtype=bool)
+        if profile == 'Kids':
+            mask &= self.genres.mask(KIDS_GENRE)
+        if genre and genre != 'All':
+            mask &= self.genres.mask(genre)
+        if year_range is not None:
+            mask &= self.years.mask(year_range[0], year_range[1])
+        return mask
+
+    def recommend(self, row, k=10, mask=None):
+        """Top ``k`` (positions, scores) similar to ``row`` among ``mask`` rows.
+
+        The precomputed neighbor list answers whenever it holds at least ``k``
+        eligible movies; otherwise the IVF index does if there is one, and a
+        masked scan over the full catalog if not. Either way the movie itself
+        is never returned.
+        """
+        ids, scores = self.neighbors.neighbors(row, self.neighbors.k)
+        if mask is not None:
+            keep = mask[ids]
+            ids, scores = ids[keep], scores[keep]
+        if ids.size >= k:
+            return ids[:k], scores[:k]
+        if self.ann is not None:
+            return self.ann.search(row, k, mask=mask)
+        return self.similarity.most_similar(row, k, mask=mask)
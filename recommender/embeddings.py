@@ -0,0 +1,46 @@
+"""Compact dense embeddings of the TF-IDF tag vectors (LSA).
+
+TruncatedSVD projects the sparse TF-IDF rows onto a few hundred latent
+dimensions, which are L2-normalized and stored as float32 (4 * D bytes per
+movie) or, optionally, as int8 codes with one float32 scale per row
+(D + 4 bytes per movie). ``DenseSimilarity`` scores them with a dense
+GEMV. Build an embedding artifact with::
+
+    python -m recommender.artifact movie_data.pkl artifacts --embedding-dims 128 --int8
+"""
+import logging
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from recommender.similarity import DenseSimilarity
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIMS = 128
+
+
+def fit_embeddings(vectors, dims=DEFAULT_DIMS, seed=0):
+    """L2-normalized float32 LSA embeddings of ``vectors`` (N x D)."""
+    dims = max(1, min(dims, vectors.shape[1] - 1, vectors.shape[0] - 1))
+    svd = TruncatedSVD(n_components=dims, algorithm='randomized', random_state=seed)
+    embeddings = svd.fit_transform(vectors)
+    logger.info("Fitted %d-dim embeddings (%.1f%% of variance)", dims, 100 * svd.explained_variance_ratio_.sum())
+    return normalize(embeddings, norm='l2', copy=False).astype(np.float32)
+
+
+def quantize_int8(embeddings):
+    """Symmetric per-row int8 quantization: ``embeddings ~= codes * scales[:, None]``."""
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.round(embeddings / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def embedding_similarity(vectors, dims=DEFAULT_DIMS, quantize=False, seed=0):
+    """Fit embeddings for ``vectors`` and wrap them in a ``DenseSimilarity``."""
+    embeddings = fit_embeddings(vectors, dims, seed)
+    if quantize:
+        return DenseSimilarity(*quantize_int8(embeddings))
+    return DenseSimilarity(embeddings)
@@ -0,0 +1,162 @@
+"""Headless recommender: catalog loading, title lookup, filtering and scoring.
+
+Nothing here imports Streamlit, so the same engine backs the app, the API
+service, batch jobs and benchmarks::
+
+    from recommender.engine import Recommender
+
+    engine = Recommender.load('artifacts')
+    engine.recommend('The Dark Knight Rises', k=10, profile='Kids')
+"""
+import logging
+import os
+
+import numpy as np
+
+from recommender.catalog import Catalog
+from recommender.similarity import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARTIFACT_DIR = os.environ.get('MOVIE_ARTIFACT_DIR', 'artifacts')
+DEFAULT_PICKLE = 'movie_data.pkl'
+
+
+class Recommender:
+    """Content-based recommendations over one loaded ``Catalog``."""
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._rows_by_id = None
+
+    @classmethod
+    def load(cls, path=DEFAULT_ARTIFACT_DIR, fallback_pickle=DEFAULT_PICKLE):
+        """Open the artifact at ``path``, or build from ``fallback_pickle`` if it is missing."""
+        if os.path.isdir(path):
+            return cls(Catalog.open(path))
+        logger.warning(f"{path} not found, falling back to {fallback_pickle}")
+        return cls(Catalog.from_pickle(fallback_pickle))
+
+    @property
+    def movies(self):
+        return self.catalog.movies
+
+    def __len__(self):
+        return len(self.catalog)
+
+    def lookup(self, title):
+        """Catalog row for ``title``, or None if it is unknown."""
+        return self.catalog.titles.get(title)
+
+    def movie_row(self, movie_id):
+        """Catalog row position for ``movie_id``, or None if it is unknown."""
+        if self._rows_by_id is None:
+            ids = self.movies['movie_id'].to_numpy()
+            # Reversed so that the first row wins when an id is duplicated.
+            self._rows_by_id = {int(movie_id): row for row, movie_id in reversed(list(enumerate(ids)))}
+        return self._rows_by_id.get(int(movie_id))
+
+    def movie(self, movie_id):
+        """Catalog row for ``movie_id`` as a Series, or None if it is unknown."""
+        row = self.movie_row(movie_id)
+        return None if row is None else self.movies.iloc[row]
+
+    def filter_mask(self, profile='Adult', genre='All', year_range=None):
+        """Boolean row mask for the profile, genre and year-range filters."""
+        return self.catalog.eligibility_mask(profile, genre, year_range)
+
+    @property
+    def genres(self):
+        return self.catalog.genres.vocabulary
+
+    def search_titles(self, query, limit=10, mask=None):
+        """Up to ``limit`` movies for a partly typed title, best match first.
+
+        Titles starting with ``query`` come first, then titles with a word
+        starting with it, then near misses; each group most popular first.
+        An empty query gives the most popular movies. ``mask`` restricts the
+        results to the filtered rows.
+        """
+        return self.movies.iloc[self.catalog.title_search.search(query, limit, mask=mask)]
+
+    def newest(self, k=6, profile='Adult', genre='All', year_range=None, mask=None):
+        """The ``k`` most recent movies passing the filters, newest first, without sorting the catalog."""
+        if mask is None:
+            mask = self.filter_mask(profile, genre)
+        rows = self.catalog.years.newest(k, mask=None if mask.all() else mask, year_range=year_range)
+        return self.movies.iloc[rows]
+
+    def movies_in_year(self, year):
+        return self.movies.iloc[self.catalog.years.rows_in_year(year)]
+
+    def movies_in_genre(self, genre):
+        return self.movies[self.catalog.genres.mask(genre)]
+
+    def movies_with_person(self, query):
+        """Movies whose top cast or directors contain ``query`` (case-insensitive)."""
+        return self.movies.iloc[self.catalog.people.search(query)].reset_index(drop=True)
+
+    def _frame(self, rows, scores):
+        return self.movies.iloc[rows].assign(score=np.asarray(scores, dtype=np.float32))
+
+    def recommend_rows(self, title, k=10, profile='Adult', genre='All', year_range=None, mask=None):
+        """Like ``recommend`` but returns ``(rows, scores)`` arrays, skipping pandas."""
+        row = self.lookup(title)
+        if row is None:
+            raise KeyError(title)
+        if mask is None:
+            mask = self.filter_mask(profile, genre, year_range)
+        # An all-true mask would only slow down the neighbor-list fast path.
+        return self.catalog.recommend(row, k=k, mask=None if mask.all() else mask)
+
+    def recommend(self, title, k=10, profile='Adult', genre='All', year_range=None, mask=None):
+        """Top ``k`` movies similar to ``title`` as catalog rows with a ``score`` column.
+
+        ``mask`` overrides the profile/genre/year filters when given. Raises
+        ``KeyError`` for an unknown title.
+        """
+        rows, scores = self.recommend_rows(title, k, profile, genre, year_range, mask)
+        return self._frame(rows, scores)
+
+    def recommend_from_rows(self, rows, weights=None, k=10, mask=None):
+        """Top ``k`` ``(rows, scores)`` for several seed rows, in one pass over the catalog.
+
+        A movie's score is its weighted mean cosine similarity to the seeds
+        (``weights`` default to equal). The seeds are never returned.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        if rows.size == 0:
+            return rows, np.empty(0, dtype=np.float32)
+        weights = np.ones(rows.size) if weights is None else np.asarray(weights, dtype=np.float64)
+        if weights.sum() <= 0:
+            weights = np.ones(rows.size)
+        scores = self.catalog.similarity.centroid_scores(rows, weights / weights.sum())
+        top = top_k_indices(scores, k, exclude=rows, mask=mask)
+        return top, scores[top]
+
+    def recommend_from_ids(self, movie_ids, weights=None, k=10, mask=None):
+        """Recommendations for a set of movies (e.g. a watchlist) as one aggregated query.
+
+        Unknown ids are skipped; returns catalog rows with a ``score`` column.
+        """
+        weights = [1.0] * len(movie_ids) if weights is None else list(weights)
+        pairs = [(self.movie_row(movie_id), weight) for movie_id, weight in zip(movie_ids, weights)]
+        pairs = [(row, weight) for row, weight in pairs if row is not None]
+        rows, scores = self.recommend_from_rows([row for row, _ in pairs], [weight for _, weight in pairs], k, mask)
+        return self._frame(rows, scores)
+
+    def recommend_many(self, titles, k=10, mask=None):
+        """Recommendations for several titles, scored with one sparse matrix product.
+
+        Returns one frame per title, in order; unknown titles get an empty frame.
+        """
+        rows = [self.lookup(title) for title in titles]
+        known = [row for row in rows if row is not None]
+        results = {}
+        if known:
+            block = self.catalog.similarity.scores_block(np.asarray(known))
+            for offset, row in enumerate(known):
+                top = top_k_indices(block[offset], k, exclude=row, mask=mask)
+                results[row] = self._frame(top, block[offset, top])
+        empty = self.movies.iloc[[]].assign(score=np.empty(0, dtype=np.float32))
+        return [results[row] if row is not None else empty for row in rows]
@@ -0,0 +1,88 @@
+"""Genre vocabulary and per-movie genre bitmasks.
+
+Genres are parsed once when the catalog loads. Each movie gets a ``uint64``
+with one bit per genre, so every genre filter is a single bitwise AND over
+the catalog instead of a regex scan of the ``genres`` strings.
+"""
+import ast
+
+import numpy as np
+
+# Genre names that contain spaces. Older datasets store genres space-joined
+# ("Action Science Fiction"), so these have to be stitched back together.
+MULTIWORD_GENRES = ('Science Fiction', 'TV Movie')
+MAX_GENRES = 64
+
+
+def parse_genres(value):
+    """Return the list of genre names stored in one ``genres`` cell."""
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(genre).strip() for genre in value if str(genre).strip()]
+    value = str(value).strip()
+    if not value or value.lower() == 'nan':
+        return []
+    if value.startswith('['):
+        try:
+            return parse_genres(ast.literal_eval(value))
+        except (ValueError, SyntaxError):
+            value = value.strip('[]')
+    for separator in ('|', ','):
+        if separator in value:
+            return [genre.strip() for genre in value.split(separator) if genre.strip()]
+    words = value.split()
+    genres = []
+    i = 0
+    while i < len(words):
+        for name in MULTIWORD_GENRES:
+            parts = name.split()
+            if words[i:i + len(parts)] == parts:
+                genres.append(name)
+                i += len(parts)
+                break
+        else:
+            genres.append(words[i])
+            i += 1
+    return genres
+
+
+class GenreIndex:
+    """Sorted genre vocabulary plus one ``uint64`` bitmask per movie."""
+
+    def __init__(self, vocabulary, bits):
+        if len(vocabulary) > MAX_GENRES:
+            raise ValueError(f"At most {MAX_GENRES} genres fit in a bitmask, got {len(vocabulary)}")
+        self.vocabulary = list(vocabulary)
+        self.bits = bits
+        self._lookup = {genre.lower(): np.uint64(1) << np.uint64(i) for i, genre in enumerate(self.vocabulary)}
+
+    @classmethod
+    def from_values(cls, values):
+        parsed = [parse_genres(value) for value in values]
+        vocabulary = sorted({genre for genres in parsed for genre in genres}, key=str.lower)
+        position = {genre: i for i, genre in enumerate(vocabulary)}
+        bits = np.zeros(len(parsed), dtype=np.uint64)
+        for row, genres in enumerate(parsed):
+            for genre in genres:
+                bits[row] |= np.uint64(1) << np.uint64(position[genre])
+        return cls(vocabulary, bits)
+
+    def bit(self, genre):
+        """Bit for ``genre`` (case-insensitive), or 0 if it is not in the vocabulary."""
+        return self._lookup.get(str(genre).lower(), np.uint64(0))
+
+    def mask(self, genre):
+        """Boolean array of movies tagged with ``genre``."""
+        return (self.bits & self.bit(genre)) != 0
+
+    def mask_any(self, genres):
+        """Boolean array of movies tagged with at least one of ``genres``."""
+        wanted = np.uint64(0)
+        for genre in genres:
+            wanted |= self.bit(genre)
+        return (self.bits & wanted) != 0
+
+    def names(self, row):
+        value = int(self.bits[row])
+        return [genre for i, genre in enumerate(self.vocabulary) if value >> i & 1]
@@ -0,0 +1,73 @@
+"""Bulk-prefetch TMDB metadata for the whole catalog into a local snapshot.
+
+Usage::
+
+    python -m recommender.hydrate artifacts snapshot --rate 20
+
+Details, trailer key and top cast are fetched for every ``movie_id`` with
+one request per movie, concurrently and under a token-bucket rate limit.
+Progress is written as Parquet parts as it goes; re-running the command
+skips movies already in the snapshot, so an interrupted run resumes where
+it stopped.
+"""
+import argparse
+import logging
+import os
+import pickle
+import time
+
+from recommender import artifact
+from recommender.snapshot import read_snapshot, snapshot_row, write_part
+from recommender.tmdb import MAX_WORKERS, RateLimiter, TMDBClient
+
+logger = logging.getLogger(__name__)
+
+PART_SIZE = 500
+
+
+def catalog_movie_ids(path):
+    """``movie_id`` column of an artifact directory/root or a dataset pickle."""
+    if os.path.isdir(path):
+        return artifact.read_catalog_frame(artifact.resolve(path))['movie_id'].astype(int).tolist()
+    with open(path, 'rb') as file:
+        movies, _ = pickle.load(file)
+    return movies['movie_id'].astype(int).tolist()
+
+
+def hydrate(client, movie_ids, directory, part_size=PART_SIZE):
+    """Fetch every id not yet in the snapshot at ``directory``; returns the number written."""
+    done = set(read_snapshot(directory)['movie_id'].astype(int))
+    todo = [movie_id for movie_id in dict.fromkeys(movie_ids) if movie_id not in done]
+    logger.info("%d movies in catalog, %d already hydrated, %d to fetch", len(movie_ids), len(done), len(todo))
+    written = 0
+    started = time.monotonic()
+    for start in range(0, len(todo), part_size):
+        chunk = todo[start:start + part_size]
+        results = client.fetch_many(chunk, kinds=('details', 'videos', 'credits'))
+        rows = [snapshot_row(movie_id, movie) for movie_id, movie in results.items() if movie]
+        if rows:
+            write_part(directory, rows)
+        written += len(rows)
+        elapsed = time.monotonic() - started
+        logger.info("%d/%d fetched (%d failed), %.1f movies/s",
+                    start + len(chunk), len(todo), len(chunk) - len(rows), (start + len(chunk)) / elapsed)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch TMDB metadata for every movie in the catalog.")
+    parser.add_argument('catalog', nargs='?', default='artifacts', help="artifact root/directory or dataset pickle")
+    parser.add_argument('output', nargs='?', default='snapshot')
+    parser.add_argument('--rate', type=float, default=20.0, help="max requests per second")
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--part-size', type=int, default=PART_SIZE)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    client = TMDBClient(max_workers=args.workers, rate_limiter=RateLimiter(args.rate))
+    written = hydrate(client, catalog_movie_ids(args.catalog), args.output, part_size=args.part_size)
+    logger.info("Wrote %d movies to %s", written, args.output)
+
+
+if __name__ == '__main__':
+    main()
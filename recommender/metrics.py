@@ -0,0 +1,203 @@
+"""In-process counters and latency histograms, exported as Prometheus text or JSON.
+
+Instrumented code records into the module-level ``REGISTRY``::
+
+    REGISTRY.inc('tmdb_requests_total', endpoint='/movie/{id}', status='200')
+    with REGISTRY.timer('app_section_seconds', section='trending'):
+        ...
+
+Recording is a dict update under one lock, so it is cheap enough to leave on
+in production. Each process has its own registry: the Streamlit app serves
+it on ``METRICS_PORT`` (``/metrics`` and ``/metrics.json``) and every API
+worker adds the same two routes to its own port.
+"""
+import bisect
+import functools
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds, in seconds.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _labels(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total, result = 0, []
+        for count in self.counts:
+            total += count
+            result.append(total)
+        return result
+
+
+class Metrics:
+    """Thread-safe registry of labelled counters and histograms."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, _labels(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    def timer(self, name, **labels):
+        """Context manager recording the duration of its block into histogram ``name``."""
+        return _Timer(self, name, labels)
+
+    def timed(self, name, **labels):
+        """Decorator form of ``timer``."""
+        def decorate(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def snapshot(self):
+        """All metrics as plain JSON-ready data."""
+        with self.lock:
+            counters = [
+                {'name': name, 'labels': dict(labels), 'value': value}
+                for (name, labels), value in sorted(self.counters.items())
+            ]
+            histograms = [
+                {
+                    'name': name, 'labels': dict(labels), 'count': histogram.count,
+                    'sum': round(histogram.sum, 6),
+                    'buckets': dict(zip([str(bound) for bound in histogram.buckets] + ['+Inf'], histogram.cumulative())),
+                }
+                for (name, labels), histogram in sorted(self.histograms.items())
+            ]
+        return {
+            'uptime_s': round(time.time() - self.started, 3),
+            'cache_hit_ratios': self.hit_ratios(),
+            'counters': counters,
+            'histograms': histograms,
+        }
+
+    def prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines, typed = [], set()
+        with self.lock:
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} counter")
+                    typed.add(name)
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+            for (name, labels), histogram in sorted(self.histograms.items()):
+                if name not in typed:
+                    lines.append(f"# TYPE {name} histogram")
+                    typed.add(name)
+                bounds = [repr(bound) for bound in histogram.buckets] + ['+Inf']
+                for bound, count in zip(bounds, histogram.cumulative()):
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum:.6f}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def hit_ratios(self):
+        """``{cache: hits / lookups}`` from the ``cache_requests_total{cache, result}`` counters."""
+        hits, totals = {}, {}
+        with self.lock:
+            for (name, labels), value in self.counters.items():
+                if name != 'cache_requests_total':
+                    continue
+                labels = dict(labels)
+                cache = labels.get('cache', '')
+                totals[cache] = totals.get(cache, 0) + value
+                if labels.get('result') == 'hit':
+                    hits[cache] = hits.get(cache, 0) + value
+        return {cache: round(hits.get(cache, 0) / total, 4) for cache, total in sorted(totals.items())}
+
+
+class _Timer:
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+REGISTRY = Metrics()
+
+
+def start_http_server(port, host='0.0.0.0', metrics=REGISTRY):
+    """Serve ``/metrics`` (Prometheus text) and ``/metrics.json`` from a daemon thread."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path = self.path.split('?', 1)[0]
+            if path == '/metrics':
+                body, content_type = metrics.prometheus().encode('utf-8'), PROMETHEUS_CONTENT_TYPE
+            elif path == '/metrics.json':
+                body, content_type = json.dumps(metrics.snapshot()).encode('utf-8'), 'application/json'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info("Serving metrics on %s:%d/metrics", host, server.server_port)
+    return server
@@ -0,0 +1,180 @@
+"""Precomputed top-K neighbor index and title lookup.
+
+The index is built offline, once per catalog, so that serving a
+recommendation is a dictionary lookup followed by an array slice.
+
+Build it next to the dataset with::
+
+    python -m recommender.neighbors movie_data.pkl movie_neighbors.npz
+"""
+import argparse
+import logging
+import pickle
+
+import numpy as np
+
+from recommender.similarity import build_similarity, top_k_indices
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_K = 50
+# Upper bound on the number of similarity cells materialized per build batch.
+BATCH_CELLS = 16_000_000
+
+
+class NeighborIndex:
+    """Top-K neighbor ids (int32) and scores (float32) for every movie.
+
+    Rows with fewer than K neighbors are padded with id ``-1``.
+    """
+
+    def __init__(self, ids, scores):
+        self.ids = ids
+        self.scores = scores
+
+    def __len__(self):
+        return self.ids.shape[0]
+
+    @property
+    def k(self):
+        return self.ids.shape[1]
+
+    @property
+    def nbytes(self):
+        return self.ids.nbytes + self.scores.nbytes
+
+    @classmethod
+    def build(cls, similarity, k=DEFAULT_K):
+        n = len(similarity)
+        k = min(k, max(n - 1, 0))
+        ids = np.full((n, k), -1, dtype=np.int32)
+        scores = np.zeros((n, k), dtype=np.float32)
+        batch = max(1, BATCH_CELLS // max(n, 1))
+        for start in range(0, n if k else 0, batch):
+            rows = np.arange(start, min(start + batch, n))
+            block = similarity.scores_block(rows)
+            for offset, row in enumerate(rows):
+                top = top_k_indices(block[offset], k, exclude=row)
+                ids[row, :top.size] = top
+                scores[row, :top.size] = block[offset, top]
+        logger.info("Built %d x %d neighbor index", n, k)
+        return cls(ids, scores)
+
+    def patched(self, similarity, changed):
+        """Neighbor lists after the ``changed`` rows of ``similarity`` were replaced or appended.
+
+        Rows past the end of this index are new. Only the changed rows are
+        scored against the catalog; other lists are patched with the changed
+        rows' new scores and rescored in full only when a changed movie
+        dropped out of a list and its replacement is unknown.
+        """
+        n, k = len(similarity), self.k
+        ids = np.full((n, k), -1, dtype=np.int32)
+        scores = np.zeros((n, k), dtype=np.float32)
+        ids[:len(self)] = self.ids
+        scores[:len(self)] = self.scores
+        changed = np.unique(np.asarray(changed, dtype=np.intp))
+        if k == 0 or changed.size == 0:
+            return NeighborIndex(ids, scores)
+        is_changed = np.zeros(n, dtype=bool)
+        is_changed[changed] = True
+        rescore = set()
+        batch = max(1, BATCH_CELLS // max(n, 1))
+        for start in range(0, changed.size, batch):
+            chunk = changed[start:start + batch]
+            block = similarity.scores_block(chunk)
+            for offset, row in enumerate(chunk):
+                top = top_k_indices(block[offset], k, exclude=row)
+                ids[row] = -1
+                ids[row, :top.size] = top
+                scores[row, :top.size] = block[offset, top]
+            full = ids[:, -1] >= 0
+            last = np.where(full, scores[:, -1], -np.inf)
+            listed = np.isin(ids, chunk).any(axis=1)
+            beaten = (block > last).any(axis=0)
+            for row in np.flatnonzero((listed | beaten) & ~is_changed):
+                keep = (ids[row] >= 0) & ~np.isin(ids[row], chunk)
+                candidates = np.concatenate([ids[row][keep], chunk])
+                candidate_scores = np.concatenate([scores[row][keep], block[:, row]])
+                order = np.lexsort((candidates, -candidate_scores))[:k]
+                # Unlisted movies score at most the old last entry; below that we know nothing.
+                if full[row] and np.count_nonzero(candidate_scores[order] >= last[row]) < k:
+                    rescore.add(int(row))
+                    continue
+                ids[row] = -1
+                ids[row, :order.size] = candidates[order]
+                scores[row, :order.size] = candidate_scores[order]
+        rescore = np.array(sorted(rescore), dtype=np.intp)
+        for start in range(0, rescore.size, batch):
+            rows = rescore[start:start + batch]
+            block = similarity.scores_block(rows)
+            for offset, row in enumerate(rows):
+                top = top_k_indices(block[offset], k, exclude=row)
+                ids[row] = -1
+                ids[row, :top.size] = top
+                scores[row, :top.size] = block[offset, top]
+        logger.info("Patched neighbor index: %d changed rows, %d lists rescored", changed.size, rescore.size)
+        return NeighborIndex(ids, scores)
+
+    def neighbors(self, row, k=10):
+        """Best ``k`` (positions, scores) for ``row``, best first."""
+        ids = self.ids[row, :k]
+        valid = ids >= 0
+        return ids[valid].astype(np.intp), self.scores[row, :k][valid]
+
+    def save(self, path):
+        np.savez(path, ids=self.ids, scores=self.scores)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['ids'], data['scores'])
+
+
+class TitleIndex:
+    """Hash map from title to catalog row.
+
+    When several movies share a title, the one with the lowest ``movie_id``
+    wins, so lookups do not depend on row order.
+    """
+
+    def __init__(self, titles, movie_ids):
+        order = np.lexsort((np.arange(len(titles)), np.asarray(movie_ids)))
+        self._rows = {}
+        for row in order.tolist():
+            self._rows.setdefault(titles[row], row)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, title):
+        return title in self._rows
+
+    def get(self, title, default=None):
+        return self._rows.get(title, default)
+
+    def __getitem__(self, title):
+        return self._rows[title]
+
+    @classmethod
+    def from_movies(cls, movies):
+        return cls(movies['title'].tolist(), movies['movie_id'].to_numpy())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the top-K neighbor index for a dataset pickle.")
+    parser.add_argument('dataset', nargs='?', default='movie_data.pkl')
+    parser.add_argument('output', nargs='?', default='movie_neighbors.npz')
+    parser.add_argument('-k', type=int, default=DEFAULT_K, help="neighbors kept per movie")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    with open(args.dataset, 'rb') as file:
+        movies, matrix = pickle.load(file)
+    index = NeighborIndex.build(build_similarity(movies, matrix), k=args.k)
+    index.save(args.output)
+    logger.info("Wrote %s (%.1f MB)", args.output, index.nbytes / 1e6)
+
+
+if __name__ == '__main__':
+    main()
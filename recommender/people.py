@@ -0,0 +1,139 @@
+"""Offline cast/crew inverted index for the chatbot Cast search.
+
+The notebook already extracts the top three cast members and the directors
+of every movie from ``tmdb_5000_credits.csv``. We keep those names as a
+sorted list of normalized names with a CSR-style posting list of catalog
+rows per name, so a search is a ``bisect`` (prefix) or a scan of one string
+(substring) with no network calls.
+"""
+import bisect
+import json
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+TOP_CAST = 3
+
+
+def normalize_name(name):
+    """Case-fold, strip accents and collapse whitespace."""
+    name = unicodedata.normalize('NFKD', str(name))
+    name = ''.join(char for char in name if not unicodedata.combining(char))
+    return re.sub(r'\s+', ' ', name).strip().casefold()
+
+
+def parse_credits(cast, crew):
+    """Top-billed cast plus directors from the raw JSON columns of the credits CSV."""
+    cast = json.loads(cast) if isinstance(cast, str) else (cast or [])
+    crew = json.loads(crew) if isinstance(crew, str) else (crew or [])
+    names = [member['name'] for member in sorted(cast, key=lambda m: m.get('order', 0))[:TOP_CAST]]
+    names += [member['name'] for member in crew if member.get('job') == 'Director']
+    return names
+
+
+def read_credits(path):
+    """Map ``movie_id`` to its people from ``tmdb_5000_credits.csv``."""
+    credits = pd.read_csv(path, usecols=['movie_id', 'cast', 'crew'])
+    return {
+        int(movie_id): parse_credits(cast, crew)
+        for movie_id, cast, crew in credits.itertuples(index=False)
+    }
+
+
+def tmdb_credits(client, movie_ids):
+    """Map ``movie_id`` to its people fetched through ``client``, for datasets without credits."""
+    movies = client.fetch_many(movie_ids, kinds=('credits',))
+    return {
+        movie_id: parse_credits((movie.get('credits') or {}).get('cast'), (movie.get('credits') or {}).get('crew'))
+        for movie_id, movie in movies.items() if movie
+    }
+
+
+def people_from_frame(movies):
+    """Per-row names from list-valued ``cast``/``crew`` columns, as the notebook builds them."""
+    columns = [column for column in ('cast', 'crew') if column in movies.columns]
+    per_row = [[] for _ in range(len(movies))]
+    for column in columns:
+        for row, names in enumerate(movies[column]):
+            if isinstance(names, str):
+                per_row[row].append(names)
+            elif isinstance(names, (list, tuple, np.ndarray)):
+                per_row[row].extend(names)
+    return per_row
+
+
+class PeopleIndex:
+    """Sorted normalized names and the catalog rows each one appears in."""
+
+    def __init__(self, names, indptr, rows):
+        self.names = names
+        self.indptr = indptr
+        self.rows = rows
+        # One newline-separated string makes substring search a handful of str.find calls.
+        self._blob = '\n'.join(names)
+        self._starts = np.cumsum([0] + [len(name) + 1 for name in names[:-1]]) if names else np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_people(cls, people_per_row):
+        """Build from an iterable holding, for every catalog row, a list of names."""
+        postings = {}
+        for row, people in enumerate(people_per_row):
+            for name in people or ():
+                key = normalize_name(name)
+                if key:
+                    postings.setdefault(key, set()).add(row)
+        names = sorted(postings)
+        indptr = np.zeros(len(names) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(postings[name]) for name in names])
+        rows = np.fromiter(
+            (row for name in names for row in sorted(postings[name])), dtype=np.int32, count=int(indptr[-1]),
+        )
+        return cls(names, indptr, rows)
+
+    @classmethod
+    def from_credits(cls, movie_ids, credits):
+        """Build from ``read_credits`` output, aligned to the catalog's ``movie_id`` column."""
+        return cls.from_people(credits.get(int(movie_id), []) for movie_id in movie_ids)
+
+    def people_per_row(self, n):
+        """Invert the index back into one list of (normalized) names per catalog row."""
+        per_row = [[] for _ in range(n)]
+        for position, name in enumerate(self.names):
+            for row in self.rows[self.indptr[position]:self.indptr[position + 1]].tolist():
+                per_row[row].append(name)
+        return per_row
+
+    def _rows_for(self, positions):
+        if len(positions) == 0:
+            return np.empty(0, dtype=np.intp)
+        parts = [self.rows[self.indptr[i]:self.indptr[i + 1]] for i in positions]
+        return np.unique(np.concatenate(parts)).astype(np.intp)
+
+    def prefix(self, query):
+        """Catalog rows for every name starting with ``query``, in catalog order."""
+        query = normalize_name(query)
+        if not query:
+            return np.empty(0, dtype=np.intp)
+        lo = bisect.bisect_left(self.names, query)
+        hi = bisect.bisect_left(self.names, query + '\uffff')
+        return self._rows_for(range(lo, hi))
+
+    def search(self, query):
+        """Catalog rows for every name containing ``query``, in catalog order."""
+        query = normalize_name(query)
+        if not query:
+            return np.empty(0, dtype=np.intp)
+        positions = []
+        start = self._blob.find(query)
+        while start != -1:
+            position = int(np.searchsorted(self._starts, start, side='right')) - 1
+            positions.append(position)
+            # Skip to the next name; one hit per name is enough.
+            next_name = self._starts[position + 1] if position + 1 < len(self._starts) else len(self._blob)
+            start = self._blob.find(query, next_name)
+        return self._rows_for(positions)
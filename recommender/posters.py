@@ -0,0 +1,223 @@
+"""Local poster thumbnails: each TMDB poster is fetched once, then served from disk.
+
+Cards are drawn three to five per row, so a full w500 poster is several
+times larger than what the browser shows. ``PosterStore`` downloads a
+smaller TMDB rendition, resizes it to ``THUMB_WIDTH`` and re-encodes it as a
+compressed JPEG in a sharded layout keyed by a hash of the poster path and
+width (``ab/abcdef....jpg``); TMDB never reuses a poster path for different
+artwork, so the key never goes stale. Files are written atomically, so every
+process on a host shares the same directory, and the least recently used
+files are evicted once it grows past its size cap. The "No Image" placeholder is drawn
+locally instead of being fetched from a third-party service, and is also what
+a poster gets for ``FAILURE_TTL`` seconds after its download failed, so a
+missing poster or a down image host is not retried on every render.
+"""
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from PIL import Image, ImageDraw
+from requests.adapters import HTTPAdapter
+
+from recommender.cache import WriteCounter, needs_touch
+from recommender.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = os.environ.get('POSTER_CACHE_DIR', os.path.join('.cache', 'posters'))
+DEFAULT_MAX_BYTES = int(os.environ.get('POSTER_CACHE_MAX_BYTES', 128 * 1024 * 1024))
+# w342 is the smallest TMDB rendition that still covers a thumbnail on a dense screen.
+SOURCE_BASE_URL = os.environ.get('TMDB_IMAGE_BASE_URL', 'https://image.tmdb.org/t/p/w342')
+THUMB_WIDTH = 300
+JPEG_QUALITY = 80
+MAX_WORKERS = 8
+# A failed download is not retried for this many seconds.
+FAILURE_TTL = 60
+
+
+def placeholder(width=THUMB_WIDTH, text="No Image"):
+    """A 2:3 dark JPEG with ``text`` centred, in the app's colours."""
+    height = width * 3 // 2
+    image = Image.new('RGB', (width, height), (34, 31, 31))
+    draw = ImageDraw.Draw(image)
+    left, top, right, bottom = draw.textbbox((0, 0), text)
+    draw.text(((width - (right - left)) / 2, (height - (bottom - top)) / 2), text, fill=(229, 9, 20))
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=JPEG_QUALITY)
+    return buffer.getvalue()
+
+
+def thumbnail(data, width=THUMB_WIDTH, quality=JPEG_QUALITY):
+    """Resize encoded image ``data`` to ``width`` (never upscaling) and re-encode as JPEG."""
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert('RGB')
+        if image.width > width:
+            image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality, optimize=True, progressive=True)
+    return buffer.getvalue()
+
+
+class PosterStore:
+    """Poster thumbnails on local disk with LRU eviction under a size cap.
+
+    With ``offline=True`` nothing is downloaded: posters already on disk are
+    served and everything else gets the placeholder.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, max_bytes=DEFAULT_MAX_BYTES, source_base_url=SOURCE_BASE_URL,
+                 width=THUMB_WIDTH, timeout=5, max_workers=MAX_WORKERS, offline=False):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.source_base_url = source_base_url.rstrip('/')
+        self.width = width
+        self.timeout = timeout
+        self.offline = offline
+        self.placeholder = placeholder(width)
+        self._writes = WriteCounter()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        # poster_path -> time until which its download is not retried.
+        self._failed = {}
+        os.makedirs(directory, exist_ok=True)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='posters')
+
+    def path(self, poster_path):
+        """Local file for ``poster_path`` (which may not exist yet)."""
+        digest = hashlib.sha256(f"{self.width}:{poster_path}".encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.jpg")
+
+    def _read(self, path):
+        try:
+            with open(path, 'rb') as file:
+                data = file.read()
+        except OSError:
+            return None
+        try:
+            if needs_touch(os.stat(path).st_mtime, time.time()):
+                os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, 'wb') as file:
+            file.write(data)
+        os.replace(tmp, path)
+        if self._writes.add():
+            self.evict()
+
+    def _download(self, poster_path, path):
+        status = 'error'
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.source_base_url}{poster_path}", timeout=self.timeout)
+            status = str(response.status_code)
+            response.raise_for_status()
+            data = thumbnail(response.content, self.width)
+        except (requests.RequestException, OSError, ValueError) as e:
+            logger.error(f"Poster download {poster_path} failed: {str(e)}")
+            with self._inflight_lock:
+                self._failed[poster_path] = time.monotonic() + FAILURE_TTL
+            return None
+        finally:
+            REGISTRY.inc('poster_downloads_total', status=status)
+            REGISTRY.observe('poster_download_seconds', time.perf_counter() - start)
+        try:
+            self._write(path, data)
+        except OSError as e:
+            logger.error(f"Poster write failed for {poster_path}: {str(e)}")
+        return data
+
+    def _lookup(self, poster_path):
+        """``(data, None)`` from disk, ``(None, future)`` for a download in flight, or
+        ``(None, None)`` while a recent failure holds off another download."""
+        path = self.path(poster_path)
+        data = self._read(path)
+        REGISTRY.inc('cache_requests_total', cache='posters', result='hit' if data is not None else 'miss')
+        if data is not None or self.offline:
+            return data, None
+        with self._inflight_lock:
+            retry_at = self._failed.get(poster_path)
+            if retry_at is not None:
+                if time.monotonic() < retry_at:
+                    REGISTRY.inc('poster_downloads_skipped_total')
+                    return None, None
+                del self._failed[poster_path]
+            # Concurrent requests for the same poster share one download.
+            future = self._inflight.get(path)
+            if future is None:
+                future = self.executor.submit(self._download, poster_path, path)
+                self._inflight[path] = future
+                future.add_done_callback(lambda _: self._release(path))
+        return None, future
+
+    def _release(self, path):
+        with self._inflight_lock:
+            self._inflight.pop(path, None)
+
+    def get(self, poster_path):
+        """Thumbnail bytes for ``poster_path``, or None when there is none to serve."""
+        if not poster_path:
+            return None
+        data, future = self._lookup(poster_path)
+        return future.result() if future is not None else data
+
+    def image(self, poster_path):
+        """Thumbnail bytes for ``poster_path``, falling back to the placeholder."""
+        return self.get(poster_path) or self.placeholder
+
+    def images(self, poster_paths):
+        """Thumbnails for a whole section at once; returns ``{poster_path: bytes}``.
+
+        Missing posters are downloaded concurrently, so a grid costs one
+        round-trip rather than one per card.
+        """
+        lookups = {poster_path: self._lookup(poster_path) for poster_path in poster_paths if poster_path}
+        return {
+            poster_path: (future.result() if future is not None else data) or self.placeholder
+            for poster_path, (data, future) in lookups.items()
+        }
+
+    def size(self):
+        return sum(entry.stat().st_size for entry in self._entries())
+
+    def _entries(self):
+        for shard in os.scandir(self.directory):
+            if shard.is_dir():
+                yield from (entry for entry in os.scandir(shard.path) if entry.name.endswith('.jpg'))
+
+    def evict(self):
+        """Drop least recently used thumbnails until the store is under 90% of its cap."""
+        try:
+            entries = [(entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in self._entries()]
+        except OSError as e:
+            logger.error(f"Poster eviction failed: {str(e)}")
+            return 0
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return 0
+        target = total - int(self.max_bytes * 0.9)
+        freed, removed = 0, 0
+        for _, size, path in sorted(entries):
+            if freed >= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            freed += size
+            removed += 1
+        logger.info("Evicted %d posters (%d bytes)", removed, freed)
+        return removed
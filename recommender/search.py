@@ -0,0 +1,208 @@
+"""Typeahead title search: word-prefix lookup ranked by popularity, with a typo-tolerant fallback.
+
+Every normalized title is indexed under each of its word starts ("the dark
+knight", "dark knight", "knight") in one sorted key list, so the titles
+matching what the user has typed so far are a ``bisect`` range. Matches at
+the start of a title rank before matches at a later word, and each group is
+most popular first. One- and two-letter prefixes match a large share of the
+catalog, so the most popular rows of every prefix with a large range are
+ranked once when the index is built (and stored with it) and a query only
+slices them.
+
+When a query has fewer prefix matches than wanted, titles sharing most of
+its character trigrams fill the rest, which absorbs a typo or two. Trigram
+posting lists are stored most popular first and cut at ``TYPO_POSTINGS``,
+so a common trigram such as "the" costs no more than a rare one.
+"""
+import bisect
+import math
+import re
+
+import numpy as np
+
+from recommender.people import normalize_name
+
+# Key ranges longer than this are ranked up front.
+HEAVY_RANGE = 1024
+# Rows kept per up-front ranking; a narrow filter that leaves fewer ranks the whole range instead.
+HEAVY_KEEP = 256
+# Queries shorter than this get no typo fallback.
+TYPO_MIN_LENGTH = 3
+# Share of a query's trigrams a title must contain to count as a near miss.
+TYPO_OVERLAP = 0.5
+# Rows read from each trigram's posting list (the most popular ones).
+TYPO_POSTINGS = 2000
+
+
+def normalize_title(title):
+    """Like ``normalize_name``, with apostrophes dropped and other punctuation as spaces."""
+    title = re.sub(r"['\u2019]", '', str(title))
+    return normalize_name(re.sub(r'[^\w\s]', ' ', title))
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def popularity_order(popularity, n):
+    """Rows most popular first; catalog order without popularity, unknown values last."""
+    if popularity is None:
+        return np.arange(n)
+    popularity = np.asarray(popularity, dtype=float)
+    return np.argsort(-np.nan_to_num(popularity, nan=-np.inf), kind='stable')
+
+
+class TitleSearch:
+    """Sorted word-start keys with their rows, plus trigram postings for near misses.
+
+    ``tiers`` is 0 where a key is the whole title and 1 where it starts at a
+    later word; ``rank[row]`` is the row's position in popularity order.
+    ``heavy`` maps each prefix with a large key range to its best rows; it
+    is ranked from the keys when not given.
+    """
+
+    def __init__(self, keys, key_rows, tiers, grams, gram_indptr, gram_rows, rank, heavy=None):
+        self.keys = keys
+        self.key_rows = key_rows
+        self.tiers = tiers
+        self.grams = grams
+        self.gram_indptr = gram_indptr
+        self.gram_rows = gram_rows
+        self.rank = rank
+        self.order = np.argsort(rank, kind='stable')
+        self._gram_positions = {gram: position for position, gram in enumerate(grams)}
+        # Tier first, then popularity, as one sortable integer per key.
+        self._key_order = np.asarray(tiers, dtype=np.int64) * len(rank) + np.asarray(rank, dtype=np.int64)[key_rows]
+        self.heavy = heavy if heavy is not None else self._rank_heavy_prefixes()
+
+    def __len__(self):
+        return len(self.rank)
+
+    @classmethod
+    def from_titles(cls, titles, popularity=None):
+        titles = [normalize_title(title) for title in titles]
+        order = popularity_order(popularity, len(titles))
+        rank = np.empty(len(titles), dtype=np.int32)
+        rank[order] = np.arange(len(titles), dtype=np.int32)
+
+        entries = []
+        for row, title in enumerate(titles):
+            for match in re.finditer(r'\S+', title):
+                entries.append((title[match.start():], row, 0 if match.start() == 0 else 1))
+        entries.sort(key=lambda entry: entry[0])
+        keys = [key for key, _, _ in entries]
+        key_rows = np.fromiter((row for _, row, _ in entries), dtype=np.int32, count=len(entries))
+        tiers = np.fromiter((tier for _, _, tier in entries), dtype=np.uint8, count=len(entries))
+
+        # Rows are visited most popular first, so every posting list comes out in that order.
+        postings = {}
+        for row in order.tolist():
+            if titles[row]:
+                for gram in trigrams(f" {titles[row]} "):
+                    postings.setdefault(gram, []).append(row)
+        grams = sorted(postings)
+        gram_indptr = np.zeros(len(grams) + 1, dtype=np.int64)
+        gram_indptr[1:] = np.cumsum([len(postings[gram]) for gram in grams])
+        gram_rows = np.fromiter(
+            (row for gram in grams for row in postings[gram]), dtype=np.int32, count=int(gram_indptr[-1]),
+        )
+        return cls(keys, key_rows, tiers, grams, gram_indptr, gram_rows, rank)
+
+    def _range(self, prefix, lo=0, hi=None):
+        hi = len(self.keys) if hi is None else hi
+        lo = bisect.bisect_left(self.keys, prefix, lo, hi)
+        return lo, bisect.bisect_left(self.keys, prefix + '\uffff', lo, hi)
+
+    def _ranked(self, lo, hi, mask=None):
+        """Distinct rows of keys ``lo:hi`` allowed by ``mask``, best first."""
+        rows, order = self.key_rows[lo:hi], self._key_order[lo:hi]
+        if mask is not None:
+            keep = mask[rows]
+            rows, order = rows[keep], order[keep]
+        rows = rows[np.argsort(order, kind='stable')]
+        # A title can match at several of its words; keep its best match.
+        _, first = np.unique(rows, return_index=True)
+        return rows[np.sort(first)].astype(np.intp)
+
+    def _rank_heavy_prefixes(self):
+        heavy = {}
+        pending = [('', 0, len(self.keys))] if len(self.keys) > HEAVY_RANGE else []
+        while pending:
+            prefix, lo, hi = pending.pop()
+            length, start = len(prefix) + 1, lo
+            while start < hi:
+                key = self.keys[start]
+                if len(key) < length:
+                    # The key is the prefix itself; it belongs to no longer prefix.
+                    start += 1
+                    continue
+                start, end = self._range(key[:length], start, hi)
+                if end - start > HEAVY_RANGE:
+                    heavy[key[:length]] = self._ranked(start, end)[:HEAVY_KEEP]
+                    pending.append((key[:length], start, end))
+                start = end
+        return heavy
+
+    def heavy_csr(self):
+        """``heavy`` as sorted prefixes, offsets and concatenated rows, for storing."""
+        prefixes = sorted(self.heavy)
+        indptr = np.zeros(len(prefixes) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([len(self.heavy[prefix]) for prefix in prefixes])
+        rows = np.concatenate([self.heavy[prefix] for prefix in prefixes]) if prefixes else np.empty(0, dtype=np.intp)
+        return prefixes, indptr, rows
+
+    @staticmethod
+    def heavy_from_csr(prefixes, indptr, rows):
+        return {prefix: rows[indptr[i]:indptr[i + 1]] for i, prefix in enumerate(prefixes)}
+
+    def popular(self, limit=10, mask=None):
+        """The ``limit`` most popular rows allowed by ``mask``."""
+        if mask is None:
+            return self.order[:limit].astype(np.intp)
+        return self.order[mask[self.order]][:limit].astype(np.intp)
+
+    def prefix(self, query, limit=10, mask=None):
+        """Rows whose title, or one of its words onwards, starts with normalized ``query``."""
+        lo, hi = self._range(query)
+        ranked = self.heavy.get(query) if hi - lo > HEAVY_RANGE else None
+        if ranked is not None:
+            hits = ranked if mask is None else ranked[mask[ranked]]
+            if hits.shape[0] >= limit:
+                return hits[:limit]
+        return self._ranked(lo, hi, mask)[:limit]
+
+    def near(self, query, limit=10, mask=None, exclude=None):
+        """Rows whose titles share at least ``TYPO_OVERLAP`` of normalized ``query``'s trigrams."""
+        # Only a leading space: the user may still be typing the last word.
+        grams = trigrams(f" {query}")
+        positions = [self._gram_positions[gram] for gram in grams if gram in self._gram_positions]
+        if not positions:
+            return np.empty(0, dtype=np.intp)
+        parts = [
+            self.gram_rows[self.gram_indptr[position]:min(self.gram_indptr[position + 1],
+                                                          self.gram_indptr[position] + TYPO_POSTINGS)]
+            for position in positions
+        ]
+        counts = np.bincount(np.concatenate(parts), minlength=len(self))
+        candidates = np.flatnonzero(counts >= max(2, math.ceil(len(grams) * TYPO_OVERLAP)))
+        if mask is not None:
+            candidates = candidates[mask[candidates]]
+        if exclude is not None and len(exclude):
+            candidates = candidates[~np.isin(candidates, exclude)]
+        best = np.lexsort((self.rank[candidates], -counts[candidates]))
+        return candidates[best][:limit].astype(np.intp)
+
+    def search(self, query, limit=10, mask=None, typos=True):
+        """Rows of the ``limit`` best matches for ``query`` among ``mask`` rows.
+
+        Title prefixes come first, then word prefixes, then (with ``typos``)
+        near misses; each group is most popular first. An empty query gives
+        the most popular rows.
+        """
+        query = normalize_title(query)
+        if not query:
+            return self.popular(limit, mask)
+        rows = self.prefix(query, limit, mask)
+        if typos and rows.shape[0] < limit and len(query) >= TYPO_MIN_LENGTH:
+            rows = np.concatenate([rows, self.near(query, limit - rows.shape[0], mask, exclude=rows)])
+        return rows
@@ -0,0 +1,233 @@
+"""On-demand cosine similarity over the sparse TF-IDF tag matrix.
+
+Instead of keeping the dense N x N ``cosine_sim`` matrix around, we keep the
+L2-normalized TF-IDF rows and compute a single row of similarities per query
+with a sparse mat-vec. Memory grows with the number of non-zero tag weights,
+not with the square of the catalog size. ``DenseSimilarity`` does the same
+over compact SVD embeddings (see ``recommender.embeddings``).
+"""
+import logging
+
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+logger = logging.getLogger(__name__)
+
+# Rows of int8 embeddings dequantized at a time by DenseSimilarity; small
+# enough that the float32 copy stays in cache.
+DENSE_CHUNK_ROWS = 1024
+
+
+def top_k_indices(scores, k, exclude=None, mask=None):
+    """Return the positions of the ``k`` highest scores, best first.
+
+    ``mask`` is an optional boolean array of eligible positions; ``exclude``
+    is a position (or positions) that is never returned. Ties are broken by
+    ascending position, which matches the order the old
+    ``sorted(enumerate(row), key=..., reverse=True)`` produced. Only the
+    candidates that can make the cut are sorted.
+    """
+    scores = np.asarray(scores)
+    if exclude is not None or mask is not None:
+        scores = scores.copy()
+        if mask is not None:
+            scores[~mask] = -np.inf
+        if exclude is not None:
+            scores[exclude] = -np.inf
+    k = min(int(k), int(np.count_nonzero(scores > -np.inf)))
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    n = scores.shape[0]
+    if k < n:
+        kth = scores[np.argpartition(scores, n - k)[n - k]]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - above.size]
+        candidates = np.concatenate([above, ties])
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+
+class TfidfModel:
+    """A fitted TF-IDF vocabulary and idf weights, frozen so new movies vectorize consistently."""
+
+    def __init__(self, terms, idf):
+        self.terms = list(terms)
+        self.idf = np.asarray(idf, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.terms)
+
+    @classmethod
+    def from_vectorizer(cls, vectorizer):
+        return cls(vectorizer.get_feature_names_out().tolist(), vectorizer.idf_)
+
+    def transform(self, tags):
+        """L2-normalized vectors for ``tags``; terms outside the vocabulary are dropped."""
+        vectorizer = TfidfVectorizer(stop_words='english', vocabulary=self.terms)
+        vectorizer.idf_ = self.idf
+        return normalize(vectorizer.transform(tags.fillna('')), norm='l2', copy=False)
+
+
+class SparseSimilarity:
+    """Cosine similarity computed row by row from L2-normalized vectors.
+
+    ``model`` is the ``TfidfModel`` the vectors came from, when it is known.
+    """
+
+    def __init__(self, vectors, normalized=False, model=None):
+        if normalized:
+            # Already unit-length (e.g. memory-mapped from an artifact); don't copy.
+            self.vectors = vectors
+        else:
+            self.vectors = normalize(sparse.csr_matrix(vectors), norm='l2', copy=False)
+        self.model = model
+
+    @classmethod
+    def from_tags(cls, tags):
+        """Fit the same TF-IDF model the notebook uses on the ``tags`` column."""
+        tfidf = TfidfVectorizer(stop_words='english')
+        return cls(tfidf.fit_transform(tags.fillna('')), model=TfidfModel.from_vectorizer(tfidf))
+
+    def __len__(self):
+        return self.vectors.shape[0]
+
+    @property
+    def nbytes(self):
+        return self.vectors.data.nbytes + self.vectors.indices.nbytes + self.vectors.indptr.nbytes
+
+    def scores(self, row):
+        """Cosine similarity of ``row`` against every movie, as a dense 1-D array."""
+        query = self.vectors[row].toarray().ravel()
+        return self.vectors @ query
+
+    def scores_block(self, rows):
+        """Similarity rows for a batch of movies, shape ``(len(rows), N)``."""
+        return (self.vectors[rows] @ self.vectors.T).toarray()
+
+    def centroid_scores(self, rows, weights):
+        """``weights @ scores_block(rows)`` in one mat-vec: similarity to the weighted seed centroid."""
+        centroid = sparse.csr_matrix(np.asarray(weights, dtype=np.float64)[None, :]) @ self.vectors[rows]
+        return (self.vectors @ centroid.T).toarray().ravel()
+
+    def most_similar(self, row, k=10, mask=None):
+        """Top ``k`` (positions, scores) for ``row``, excluding the movie itself.
+
+        With ``mask``, only positions where it is true are considered.
+        """
+        scores = self.scores(row)
+        indices = top_k_indices(scores, k, exclude=row, mask=mask)
+        return indices, scores[indices]
+
+
+class DenseSimilarity:
+    """Cosine similarity over dense, L2-normalized embeddings.
+
+    ``embeddings`` is float32, or int8 codes with one float32 ``scales``
+    entry per row (see ``embeddings.quantize_int8``). Scoring a query is one
+    small GEMV: N x D with D in the low hundreds.
+    """
+
+    def __init__(self, embeddings, scales=None):
+        self.embeddings = embeddings
+        self.scales = scales
+
+    def __len__(self):
+        return self.embeddings.shape[0]
+
+    @property
+    def quantized(self):
+        return self.scales is not None
+
+    @property
+    def nbytes(self):
+        return self.embeddings.nbytes + (self.scales.nbytes if self.quantized else 0)
+
+    def vectors_for(self, rows):
+        vectors = np.asarray(self.embeddings[rows], dtype=np.float32)
+        if self.quantized:
+            vectors = vectors * np.asarray(self.scales[rows], dtype=np.float32)[..., None]
+        return vectors
+
+    def _dot(self, queries):
+        if not self.quantized:
+            return self.embeddings @ queries
+        # Dequantize in chunks so the float32 copy stays small.
+        out = np.empty((len(self),) + queries.shape[1:], dtype=np.float32)
+        for start in range(0, len(self), DENSE_CHUNK_ROWS):
+            end = start + DENSE_CHUNK_ROWS
+            block = self.embeddings[start:end].astype(np.float32) @ queries
+            scales = self.scales[start:end]
+            out[start:end] = block * (scales if block.ndim == 1 else scales[:, None])
+        return out
+
+    def scores(self, row):
+        return self._dot(self.vectors_for(row))
+
+    def scores_block(self, rows):
+        return self._dot(self.vectors_for(rows).T).T
+
+    def centroid_scores(self, rows, weights):
+        return self._dot(np.asarray(weights, dtype=np.float32) @ self.vectors_for(rows))
+
+    def most_similar(self, row, k=10, mask=None):
+        scores = self.scores(row)
+        indices = top_k_indices(scores, k, exclude=row, mask=mask)
+        return indices, scores[indices]
+
+
+class PrecomputedSimilarity:
+    """Fallback for old pickles that carry only a precomputed similarity matrix."""
+
+    def __init__(self, matrix):
+        self.matrix = matrix
+
+    def __len__(self):
+        return self.matrix.shape[0]
+
+    @property
+    def nbytes(self):
+        if sparse.issparse(self.matrix):
+            return self.matrix.data.nbytes + self.matrix.indices.nbytes + self.matrix.indptr.nbytes
+        return self.matrix.nbytes
+
+    def scores(self, row):
+        scores = self.matrix[row]
+        if sparse.issparse(scores):
+            scores = scores.toarray()
+        return np.asarray(scores, dtype=np.float64).ravel()
+
+    def scores_block(self, rows):
+        block = self.matrix[rows]
+        if sparse.issparse(block):
+            block = block.toarray()
+        return np.asarray(block, dtype=np.float64)
+
+    def centroid_scores(self, rows, weights):
+        return np.asarray(weights, dtype=np.float64) @ self.scores_block(rows)
+
+    def most_similar(self, row, k=10, mask=None):
+        scores = self.scores(row)
+        indices = top_k_indices(scores, k, exclude=row, mask=mask)
+        return indices, scores[indices]
+
+
+def build_similarity(movies, matrix):
+    """Pick a similarity engine for the ``(movies, matrix)`` pair from ``movie_data.pkl``.
+
+    New pickles store the TF-IDF matrix itself. Older ones store the dense
+    cosine matrix; if they still carry ``tags`` we refit TF-IDF and drop the
+    dense matrix, otherwise we keep using it as-is.
+    """
+    n = len(movies)
+    if sparse.issparse(matrix) and matrix.shape[0] == n and matrix.shape[1] != n:
+        logger.info("Using stored TF-IDF vectors: %s", matrix.shape)
+        return SparseSimilarity(matrix)
+    if 'tags' in movies.columns:
+        logger.info("Rebuilding TF-IDF vectors from tags for %d movies", n)
+        return SparseSimilarity.from_tags(movies['tags'])
+    logger.warning("No tags column; falling back to the precomputed similarity matrix")
+    return PrecomputedSimilarity(matrix)
@@ -0,0 +1,118 @@
+"""Local columnar snapshot of TMDB metadata, and a client that serves from it.
+
+``python -m recommender.hydrate`` writes the snapshot as Parquet parts, one
+row per movie. ``SnapshotClient`` answers the same calls as ``TMDBClient``
+from those rows without any network I/O, which is what the app's offline
+mode uses.
+"""
+import glob
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIR = os.environ.get('MOVIE_SNAPSHOT_DIR', 'snapshot')
+PART_GLOB = 'part-*.parquet'
+TRENDING_SIZE = 20
+
+COLUMNS = [
+    'movie_id', 'title', 'overview', 'release_date', 'runtime', 'vote_average', 'popularity',
+    'poster_path', 'imdb_id', 'genres', 'trailer_key', 'top_cast',
+]
+
+
+def snapshot_row(movie_id, movie):
+    """Flatten one ``/movie/{id}?append_to_response=videos,credits`` payload."""
+    trailer_key = None
+    for video in (movie.get('videos') or {}).get('results', []):
+        if video.get('site') == 'YouTube' and video.get('type') == 'Trailer':
+            trailer_key = video.get('key')
+            break
+    cast = (movie.get('credits') or {}).get('cast', [])[:3]
+    return {
+        'movie_id': int(movie_id),
+        'title': movie.get('title'),
+        'overview': movie.get('overview'),
+        'release_date': movie.get('release_date'),
+        'runtime': movie.get('runtime'),
+        'vote_average': movie.get('vote_average'),
+        'popularity': movie.get('popularity'),
+        'poster_path': movie.get('poster_path'),
+        'imdb_id': movie.get('imdb_id'),
+        'genres': [genre['name'] for genre in movie.get('genres', [])],
+        'trailer_key': trailer_key,
+        'top_cast': [member['name'] for member in cast],
+    }
+
+
+def to_movie(row):
+    """Rebuild the TMDB-shaped payload the app renders from a snapshot row."""
+    movie = {
+        'id': int(row['movie_id']),
+        'title': row['title'],
+        'overview': row['overview'],
+        'release_date': row['release_date'],
+        'runtime': row['runtime'],
+        'vote_average': row['vote_average'],
+        'popularity': row['popularity'],
+        'poster_path': row['poster_path'],
+        'imdb_id': row['imdb_id'],
+        'genres': [{'name': name} for name in row['genres']],
+        'videos': {'results': []},
+        'credits': {'cast': [{'name': name} for name in row['top_cast']]},
+    }
+    if row['trailer_key']:
+        movie['videos']['results'].append({'site': 'YouTube', 'type': 'Trailer', 'key': row['trailer_key']})
+    return movie
+
+
+def part_paths(directory):
+    return sorted(glob.glob(os.path.join(directory, PART_GLOB)))
+
+
+def read_snapshot(directory):
+    paths = part_paths(directory)
+    if not paths:
+        return pd.DataFrame(columns=COLUMNS)
+    frame = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+    # A resumed run may have re-fetched a movie; keep the newest row.
+    return frame.drop_duplicates('movie_id', keep='last').reset_index(drop=True)
+
+
+def write_part(directory, rows):
+    os.makedirs(directory, exist_ok=True)
+    number = len(part_paths(directory))
+    path = os.path.join(directory, f'part-{number:05d}.parquet')
+    tmp = path + '.tmp'
+    pd.DataFrame(rows, columns=COLUMNS).to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+    return path
+
+
+class SnapshotClient:
+    """Drop-in for ``TMDBClient`` that never touches the network."""
+
+    def __init__(self, directory=DEFAULT_DIR):
+        frame = read_snapshot(directory)
+        self.movies = {int(row['movie_id']): to_movie(row) for row in frame.to_dict('records')}
+        ranked = frame.sort_values('popularity', ascending=False, na_position='last')
+        self._trending = [self.movies[int(movie_id)] for movie_id in ranked['movie_id'].head(TRENDING_SIZE)]
+        logger.info("Loaded snapshot of %d movies from %s", len(self.movies), directory)
+
+    def __len__(self):
+        return len(self.movies)
+
+    def movie(self, movie_id, append=('videos', 'credits')):
+        return self.movies.get(int(movie_id))
+
+    def trending(self, window='week'):
+        # No live trending offline; the most popular snapshot titles stand in.
+        return list(self._trending)
+
+    def fetch_many(self, movie_ids, kinds=('details', 'videos')):
+        return {int(movie_id): self.movies.get(int(movie_id)) for movie_id in movie_ids}
+
+    def prefetch(self, movie_ids, append=('videos', 'credits')):
+        pass
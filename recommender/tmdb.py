@@ -0,0 +1,372 @@
+"""Pooled, concurrent TMDB client.
+
+One ``requests.Session`` keeps connections alive across calls, and card
+sections fetch all of their movies at once through a bounded thread pool.
+A single ``/movie/{id}?append_to_response=videos,credits`` request returns
+everything a card shows: the poster for its face, and the details, trailer
+and top cast for when it is opened, so an opened card costs no second call.
+``prefetch`` warms the cache for the cards likely to be opened next.
+
+With a ``DiskCache`` attached, responses are shared between processes and
+survive restarts. Expired entries are served immediately while a background
+refresh runs (stale-while-revalidate), so a slow TMDB never blocks a render.
+
+Identical requests in flight at the same time (e.g. several sessions opening
+the same movie) share one HTTP call. Requests go through a token bucket that
+also backs off when TMDB's rate-limit headers say so, transient failures
+(timeouts, connection errors, 429 and 5xx) are retried with jittered
+exponential backoff, all attempts of one call sharing a ``RETRY_DEADLINE``
+budget, and after repeated failures a circuit breaker makes
+calls fail fast for a while, so pages fall back to local data (the optional
+``fallback`` snapshot, then the catalog itself) instead of stalling. Failures
+are never written to the cache.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from tenacity import Retrying, retry_if_exception_type, stop_after_attempt, stop_before_delay, wait_random_exponential
+
+from recommender.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+API_KEY = os.environ.get('TMDB_API_KEY', '5c35b598fd61fbe662ae2f088ac68559')
+BASE_URL = os.environ.get('TMDB_BASE_URL', 'https://api.themoviedb.org/3')
+MAX_WORKERS = 8
+# TMDB allows roughly 50 requests per second per IP; stay under it.
+DEFAULT_RATE = 40
+# (connect, read) timeout of one attempt, in seconds.
+TIMEOUT = (3.05, 2)
+# Retries of a transient failure: attempts, total time budget and backoff (seconds).
+# The budget covers every attempt and pause, so a slow TMDB holds a call no longer than this.
+MAX_ATTEMPTS = 3
+RETRY_DEADLINE = 5
+RETRY_BACKOFF = 0.25
+RETRY_BACKOFF_MAX = 2
+# Longest pause a Retry-After or X-RateLimit-Reset header can impose.
+MAX_RATE_LIMIT_WAIT = 10
+# Consecutive failed requests that open the circuit, and how long it stays open.
+BREAKER_FAILURES = 5
+BREAKER_RESET = 30
+
+# Which appended sub-resource each batch "kind" needs; details come with every request.
+APPEND = {'details': None, 'videos': 'videos', 'credits': 'credits'}
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+# Per-endpoint (ttl, stale) in seconds: entries are fresh for `ttl`, then served
+# stale while revalidating for up to `stale` more seconds.
+CACHE_TTLS = {
+    'movie': (7 * DAY, 30 * DAY),
+    'trending': (HOUR, DAY),
+}
+
+
+def trailer_url(movie):
+    """YouTube trailer link from a movie fetched with ``videos`` appended, or None."""
+    if not movie:
+        return None
+    for video in (movie.get('videos') or {}).get('results', []):
+        if video.get('site') == 'YouTube' and video.get('type') == 'Trailer':
+            return f"https://www.youtube.com/watch?v={video['key']}"
+    return None
+
+
+def top_cast(movie, n=3):
+    """First ``n`` cast entries from a movie fetched with ``credits`` appended."""
+    if not movie:
+        return []
+    return (movie.get('credits') or {}).get('cast', [])[:n]
+
+
+def endpoint_label(path):
+    """``path`` with numeric ids folded, e.g. ``/movie/{id}``, for low-cardinality metric labels."""
+    return re.sub(r'/\d+', '/{id}', path)
+
+
+def poster_path(movie):
+    return movie.get('poster_path') if movie else None
+
+
+class TransientError(Exception):
+    """A response worth retrying (429 or 5xx)."""
+
+
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, TransientError)
+
+
+class RateLimiter:
+    """Thread-safe token bucket: ``rate`` requests per second, bursts up to ``burst``."""
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.resume_at = 0.0
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                if now < self.resume_at:
+                    wait = self.resume_at - now
+                else:
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                    self.updated = now
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def defer(self, seconds):
+        """Hold every caller for ``seconds`` (e.g. from a ``Retry-After`` header), then start with one token."""
+        with self.lock:
+            self.resume_at = max(self.resume_at, time.monotonic() + seconds)
+            self.tokens = min(self.tokens, 1.0)
+            self.updated = self.resume_at
+
+
+class CircuitBreaker:
+    """Opens after ``failures`` consecutive failures and rejects calls for ``reset_after`` seconds.
+
+    Once that has passed, a single trial call is let through (half-open):
+    success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, failures=BREAKER_FAILURES, reset_after=BREAKER_RESET):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.consecutive = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self.lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half-open' if time.monotonic() - self.opened_at >= self.reset_after else 'open'
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.probing or time.monotonic() - self.opened_at < self.reset_after:
+                return False
+            self.probing = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.consecutive = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.consecutive += 1
+            if self.probing or self.consecutive >= self.failures:
+                if self.opened_at is None or self.probing:
+                    logger.warning(f"TMDB circuit opened after {self.consecutive} failures")
+                    REGISTRY.inc('tmdb_circuit_opened_total')
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+
+def rate_limit_delay(response):
+    """Seconds TMDB asks us to wait, from ``Retry-After`` or an exhausted ``X-RateLimit-*`` window."""
+    headers = response.headers
+    try:
+        if response.status_code == 429 and headers.get('Retry-After'):
+            return float(headers['Retry-After'])
+        if headers.get('X-RateLimit-Remaining') == '0' and headers.get('X-RateLimit-Reset'):
+            return max(0.0, float(headers['X-RateLimit-Reset']) - time.time())
+    except ValueError:
+        pass
+    return 1.0 if response.status_code == 429 else 0.0
+
+
+class TMDBClient:
+    """Thin TMDB v3 client sharing one connection pool between threads.
+
+    ``fallback`` is an optional client with the same interface (e.g. a
+    ``SnapshotClient``) that answers when TMDB cannot.
+    """
+
+    def __init__(self, api_key=API_KEY, base_url=BASE_URL, timeout=TIMEOUT, max_workers=MAX_WORKERS, cache=None,
+                 rate_limiter=None, breaker=None, fallback=None, max_attempts=MAX_ATTEMPTS, deadline=RETRY_DEADLINE):
+        self.api_key = api_key
+        self.cache = cache
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter(DEFAULT_RATE)
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.fallback = fallback
+        self.max_attempts = max_attempts
+        self.deadline = deadline
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tmdb')
+
+    def get(self, path, **params):
+        """GET ``path`` and return the decoded JSON, or None on any request error.
+
+        Concurrent calls with the same path and parameters share one request.
+        """
+        key = (path, tuple(sorted(params.items())))
+        with self._inflight_lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+        if not leader:
+            REGISTRY.inc('tmdb_coalesced_total', endpoint=endpoint_label(path))
+            return future.result()
+        try:
+            result = self._request(path, params)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+
+    def _request(self, path, params):
+        endpoint = endpoint_label(path)
+        if not self.breaker.allow():
+            REGISTRY.inc('tmdb_requests_total', endpoint=endpoint, status='circuit_open')
+            return None
+        retrying = Retrying(
+            retry=retry_if_exception_type(TRANSIENT_ERRORS),
+            # Don't start a pause or attempt that would run past the deadline.
+            stop=stop_after_attempt(self.max_attempts) | stop_before_delay(self.deadline),
+            wait=wait_random_exponential(multiplier=RETRY_BACKOFF, max=RETRY_BACKOFF_MAX),
+            reraise=True,
+        )
+        deadline = time.monotonic() + self.deadline
+        try:
+            for attempt in retrying:
+                with attempt:
+                    result = self._attempt(path, dict(params, api_key=self.api_key), endpoint, deadline)
+        except TRANSIENT_ERRORS as e:
+            logger.error(f"TMDB request {path} failed after retries: {str(e)}")
+            self.breaker.record_failure()
+            return None
+        except (requests.RequestException, ValueError) as e:
+            # TMDB answered (e.g. 404), so it is up; just nothing usable.
+            logger.error(f"TMDB request {path} failed: {str(e)}")
+            self.breaker.record_success()
+            return None
+        self.breaker.record_success()
+        return result
+
+    def _attempt(self, path, params, endpoint, deadline):
+        self.rate_limiter.acquire()
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"No time left for {path}")
+        # The last attempt only gets what is left of the call's budget.
+        connect, read = self.timeout if isinstance(self.timeout, tuple) else (self.timeout, self.timeout)
+        timeout = (min(connect, remaining), min(read, remaining))
+        status = 'error'
+        start = time.perf_counter()
+        try:
+            response = self.session.get(f"{self.base_url}{path}", params=params, timeout=timeout)
+            status = str(response.status_code)
+            delay = rate_limit_delay(response)
+            if delay > 0:
+                self.rate_limiter.defer(min(delay, MAX_RATE_LIMIT_WAIT))
+            if response.status_code == 429 or response.status_code >= 500:
+                raise TransientError(f"{response.status_code} from TMDB for {path}")
+            response.raise_for_status()
+            return response.json()
+        finally:
+            REGISTRY.inc('tmdb_requests_total', endpoint=endpoint, status=status)
+            REGISTRY.observe('tmdb_request_seconds', time.perf_counter() - start, endpoint=endpoint)
+
+    def cached(self, endpoint, key, fetch):
+        """Serve ``fetch()`` through the disk cache with the TTLs of ``endpoint``."""
+        if self.cache is None:
+            return fetch()
+        ttl, stale = CACHE_TTLS[endpoint]
+        value, fresh = self.cache.get(key)
+        if fresh:
+            REGISTRY.inc('cache_requests_total', cache='tmdb', endpoint=endpoint, result='hit')
+            return value
+        if value is not None:
+            REGISTRY.inc('cache_requests_total', cache='tmdb', endpoint=endpoint, result='stale')
+            self._revalidate(key, fetch, ttl, stale)
+            return value
+        REGISTRY.inc('cache_requests_total', cache='tmdb', endpoint=endpoint, result='miss')
+        value = fetch()
+        if value is not None:
+            self.cache.set(key, value, ttl, stale)
+        return value
+
+    def _revalidate(self, key, fetch, ttl, stale):
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                value = fetch()
+                if value is not None:
+                    self.cache.set(key, value, ttl, stale)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        self.executor.submit(refresh)
+
+    def movie(self, movie_id, append=('videos', 'credits')):
+        movie_id = int(movie_id)
+        params = {'append_to_response': ','.join(append)} if append else {}
+        movie = self.cached(
+            'movie', f"movie:{movie_id}:{','.join(append)}",
+            lambda: self.get(f"/movie/{movie_id}", **params),
+        )
+        if movie is None and self.fallback is not None:
+            return self.fallback.movie(movie_id, append)
+        return movie
+
+    def trending(self, window='week'):
+        data = self.cached('trending', f"trending:{window}", lambda: self.get(f"/trending/movie/{window}"))
+        if not data and self.fallback is not None:
+            return self.fallback.trending(window)
+        return data.get('results', []) if data else []
+
+    def fetch_many(self, movie_ids, kinds=('details', 'videos')):
+        """Fetch several movies concurrently; returns ``{movie_id: payload or None}``.
+
+        Every kind in ``kinds`` is served by the same request per movie through
+        ``append_to_response``.
+        """
+        append = tuple(APPEND[kind] for kind in kinds if APPEND[kind])
+        movie_ids = list(dict.fromkeys(int(movie_id) for movie_id in movie_ids))
+        results = self.executor.map(lambda movie_id: self.movie(movie_id, append), movie_ids)
+        return dict(zip(movie_ids, results))
+
+    def prefetch(self, movie_ids, append=('videos', 'credits')):
+        """Warm the cache for ``movie_ids`` on the pool and return at once."""
+        for movie_id in movie_ids:
+            self.executor.submit(self.movie, movie_id, append)
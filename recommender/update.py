@@ -0,0 +1,115 @@
+"""Incremental catalog updates against the artifact's frozen TF-IDF vocabulary.
+
+Adds new movies and replaces changed ones without refitting TF-IDF or
+rebuilding the neighbor index: only the changed rows are vectorized and
+scored against the catalog, and the neighbor lists they enter or leave are
+patched. The result is written as a new artifact version, and ``CURRENT``
+is swapped atomically::
+
+    python -m recommender.update artifacts new_movies.parquet --credits credits.csv
+
+The input (Parquet, CSV or a pickled DataFrame) has the catalog's columns;
+``movie_id``, ``title`` and ``tags`` are required. A ``movie_id`` already in
+the catalog replaces that movie. Tag words outside the frozen vocabulary are
+ignored until the next full build.
+"""
+import argparse
+import logging
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from recommender import artifact
+from recommender.catalog import Catalog
+from recommender.genres import GenreIndex
+from recommender.people import PeopleIndex, people_from_frame, read_credits
+from recommender.similarity import SparseSimilarity
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_COLUMNS = ['movie_id', 'title', 'tags']
+
+
+def read_movies(path):
+    """Load the movies to upsert from Parquet, CSV or a pickle."""
+    if path.endswith('.parquet'):
+        movies = pd.read_parquet(path)
+    elif path.endswith('.csv'):
+        movies = pd.read_csv(path)
+    else:
+        with open(path, 'rb') as file:
+            movies = pickle.load(file)
+        if isinstance(movies, tuple):
+            # A movie_data.pkl-style (movies, matrix) pair.
+            movies = movies[0]
+    missing = [column for column in REQUIRED_COLUMNS if column not in movies.columns]
+    if missing:
+        raise ValueError(f"{path} is missing required columns: {', '.join(missing)}")
+    return movies
+
+
+def apply_updates(catalog, updates, credits=None):
+    """Return ``(catalog, changed_rows)`` with ``updates`` upserted into ``catalog``."""
+    similarity = catalog.similarity
+    if not isinstance(similarity, SparseSimilarity) or similarity.model is None:
+        raise ValueError("Incremental updates need the TF-IDF vocabulary; rebuild the artifact with "
+                         "python -m recommender.artifact --refit-tfidf")
+    updates = updates.drop_duplicates('movie_id', keep='last').reset_index(drop=True)
+    n = len(catalog)
+    rows_by_id = {}
+    for row, movie_id in enumerate(catalog.movies['movie_id'].tolist()):
+        rows_by_id.setdefault(int(movie_id), row)
+    target = np.empty(len(updates), dtype=np.intp)
+    next_row = n
+    for i, movie_id in enumerate(updates['movie_id'].tolist()):
+        row = rows_by_id.get(int(movie_id))
+        if row is None:
+            row, next_row = next_row, next_row + 1
+        target[i] = row
+    appended = next_row - n
+
+    # Row i of the new catalog comes from position order[i] of old rows + update rows.
+    order = np.arange(n + appended)
+    order[target] = n + np.arange(len(updates))
+    frame = pd.concat([catalog.movies, updates.reindex(columns=catalog.movies.columns)], ignore_index=True)
+    movies = frame.iloc[order].reset_index(drop=True)
+    vectors = sparse.vstack([similarity.vectors, similarity.model.transform(updates['tags'])], format='csr')[order]
+    similarity = SparseSimilarity(vectors, normalized=True, model=similarity.model)
+
+    neighbors = catalog.neighbors.patched(similarity, target)
+    ann = catalog.ann.patched(vectors, target) if catalog.ann is not None else None
+    per_row = catalog.people.people_per_row(n) + [[] for _ in range(appended)]
+    if credits is not None:
+        new_people = [credits.get(int(movie_id), []) for movie_id in updates['movie_id']]
+    else:
+        new_people = people_from_frame(updates)
+    for row, people in zip(target.tolist(), new_people):
+        per_row[row] = people
+    updated = Catalog(movies, similarity, neighbors, genres=GenreIndex.from_values(movies['genres']),
+                      people=PeopleIndex.from_people(per_row), ann=ann)
+    logger.info("Upserted %d movies (%d new, %d replaced)", len(updates), appended, len(updates) - appended)
+    return updated, target
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Add or replace movies in an artifact without a full rebuild.")
+    parser.add_argument('root', help="artifact root, e.g. artifacts")
+    parser.add_argument('movies', help="Parquet, CSV or pickle with the movies to upsert")
+    parser.add_argument('--credits', help="credits CSV for the new movies' cast/crew search entries")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+    catalog = Catalog.open(args.root)
+    credits = read_credits(args.credits) if args.credits else None
+    updated, _ = apply_updates(catalog, read_movies(args.movies), credits)
+    artifact.write_artifact(args.root, updated, source=f'{catalog.version} + {os.path.basename(args.movies)}')
+    logger.info("Update finished in %.1fs", time.perf_counter() - start)
+
+
+if __name__ == '__main__':
+    main()
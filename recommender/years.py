@@ -0,0 +1,67 @@
+"""Release-year index: catalog rows ordered newest first.
+
+Built once at load with a stable sort, so movies from the same year keep
+catalog order and movies without a year come last. A year range is then a
+pair of ``searchsorted`` calls and a slice, and "the newest N movies that
+pass a filter" walks that slice from the front and stops as soon as it has
+N, instead of sorting the filtered catalog.
+"""
+import numpy as np
+
+# Rows checked against the mask per step of the newest-first walk, per wanted result.
+WALK_FACTOR = 8
+
+
+class YearIndex:
+    """``order`` is every catalog row, newest first; ``keys`` is ``-release_year`` in that order."""
+
+    def __init__(self, order, keys):
+        self.order = order
+        self.keys = keys
+
+    def __len__(self):
+        return self.order.shape[0]
+
+    @classmethod
+    def from_years(cls, years):
+        years = np.asarray(years, dtype=float)
+        # NaN sorts last, so movies without a year come after every dated one.
+        order = np.argsort(-years, kind='stable')
+        return cls(order, -years[order])
+
+    def bounds(self, low=None, high=None):
+        """``(start, end)`` into ``order`` of the rows released in ``[low, high]``."""
+        start = 0 if high is None else int(np.searchsorted(self.keys, -high, side='left'))
+        end = int(np.searchsorted(self.keys, np.inf if low is None else -low, side='right'))
+        return start, max(start, end)
+
+    def rows_between(self, low=None, high=None):
+        """Rows released in ``[low, high]``, newest first."""
+        start, end = self.bounds(low, high)
+        return self.order[start:end]
+
+    def rows_in_year(self, year):
+        """Rows released in ``year``, in catalog order."""
+        return self.rows_between(year, year)
+
+    def mask(self, low=None, high=None):
+        """Boolean array of rows released in ``[low, high]``."""
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.rows_between(low, high)] = True
+        return mask
+
+    def newest(self, k, mask=None, year_range=None):
+        """The ``k`` most recent rows allowed by ``mask`` (within ``year_range``)."""
+        rows = self.rows_between(*year_range) if year_range is not None else self.order
+        if mask is None:
+            return rows[:k]
+        found, start, step = [], 0, max(k, 1) * WALK_FACTOR
+        remaining = k
+        while remaining > 0 and start < rows.shape[0]:
+            chunk = rows[start:start + step]
+            chunk = chunk[mask[chunk]][:remaining]
+            found.append(chunk)
+            remaining -= chunk.shape[0]
+            start += step
+            step *= 2
+        return np.concatenate(found) if found else rows[:0]
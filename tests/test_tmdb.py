@@ -0,0 +1,42 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from recommender.tmdb import RETRY_DEADLINE, RateLimiter, TMDBClient
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """Accepts the connection, then takes far longer to answer than any timeout."""
+
+    def do_GET(self):
+        time.sleep(30)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def slow_tmdb():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_slow_upstream_fails_within_the_retry_budget(slow_tmdb):
+    client = TMDBClient(base_url=slow_tmdb, rate_limiter=RateLimiter(100))
+    start = time.monotonic()
+    assert client.movie(1) is None
+    assert time.monotonic() - start < RETRY_DEADLINE + 0.5
+
+
+def test_last_attempt_is_cut_to_the_time_left(slow_tmdb):
+    # Two full 0.8 s reads fit in 2 s; the third attempt only gets what is left.
+    client = TMDBClient(base_url=slow_tmdb, rate_limiter=RateLimiter(100), timeout=(0.5, 0.8), deadline=2)
+    start = time.monotonic()
+    assert client.movie(1) is None
+    assert time.monotonic() - start < 2.3